@@ -0,0 +1,65 @@
+"""Per-entry cost of the message codec.
+
+Encodes and decodes Bitswap messages whose CIDs recur across messages, as
+they do on a busy node, and reports microseconds per entry for wantlist
+entries, block presences and payload blocks.
+
+Run from the repository root: python -m benchmarks.codec_benchmark
+"""
+from typing import Callable, List
+from argparse import ArgumentParser
+import hashlib
+import time
+
+import multihash
+from cid import make_cid
+
+from bitswap.data_structure.block import Block
+from bitswap.message.bitswap_message import BitswapMessage
+from bitswap.message.message_decoder import MessageDecoder
+from bitswap.message.message_encoder import MessageEncoder
+from bitswap.message.proto_buff import ProtoBuff
+
+
+def make_blocks(count: int, size: int) -> List[Block]:
+    blocks = []
+    for i in range(count):
+        data = i.to_bytes(8, 'big') * (size // 8)
+        blocks.append(Block(make_cid(1, 'raw', multihash.encode(hashlib.sha256(data).digest(), 'sha2-256')), data))
+    return blocks
+
+
+def bench(name: str, func: Callable[[], None], entries: int, rounds: int) -> None:
+    func()
+    start = time.perf_counter()
+    for _ in range(rounds):
+        func()
+    print(f'{name:>18}: us_per_entry={(time.perf_counter() - start) / (rounds * entries) * 1e6:.2f}')
+
+
+def main() -> None:
+    parser = ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--entries', type=int, default=256)
+    parser.add_argument('--block-size', type=int, default=256)
+    parser.add_argument('--rounds', type=int, default=50)
+    args = parser.parse_args()
+    blocks = make_blocks(args.entries, args.block_size)
+
+    wants = BitswapMessage(False)
+    for block in blocks:
+        wants.add_entry(block.cid, 1, False, ProtoBuff.WantType.Block, True)
+    presences = BitswapMessage(False)
+    for block in blocks:
+        presences.add_block_presence(block.cid, ProtoBuff.BlockPresenceType.Have)
+    payload = BitswapMessage(False)
+    for block in blocks:
+        payload.add_block(block)
+
+    for name, message in (('wants', wants), ('presences', presences), ('payload', payload)):
+        raw = MessageEncoder.serialize_1_1_0(message)
+        bench(f'encode {name}', lambda: MessageEncoder.serialize_1_1_0(message), args.entries, args.rounds)
+        bench(f'decode {name}', lambda: MessageDecoder.deserialize(raw), args.entries, args.rounds)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""Cold-start regression check.
+
+Measures, each in a fresh interpreter, the time to import the package, to
+import Bitswap and to construct it, and fails if a heavy optional dependency
+is loaded eagerly or a time budget is exceeded.
+
+Run from the repository root: python -m benchmarks.import_time
+"""
+from typing import List, Dict
+from argparse import ArgumentParser
+from statistics import median
+import json
+import subprocess
+import sys
+
+LAZY_MODULES = ('concurrent_log_handler', 'colorlog', 'google.protobuf', 'bitswap.message.pb.message_pb2')
+
+PROBE = '''
+import json, sys, time
+start = time.perf_counter()
+import bitswap
+package = time.perf_counter()
+from bitswap import Bitswap
+imported = time.perf_counter()
+Bitswap(None, None)
+constructed = time.perf_counter()
+print(json.dumps({
+    'import_package': package - start,
+    'import_bitswap': imported - start,
+    'construct': constructed - imported,
+    'loaded': [m for m in %r if m in sys.modules],
+}))
+''' % (LAZY_MODULES,)
+
+
+def probe() -> Dict:
+    out = subprocess.run([sys.executable, '-c', PROBE], check=True, capture_output=True, text=True).stdout
+    return json.loads(out)
+
+
+def main() -> None:
+    parser = ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--budget-ms', type=float, default=250, help='budget for import plus construction')
+    args = parser.parse_args()
+    results: List[Dict] = [probe() for _ in range(args.runs)]
+    timings = {k: median(r[k] for r in results) * 1000 for k in ('import_package', 'import_bitswap', 'construct')}
+    print(' '.join(f'{k}_ms={v:.1f}' for k, v in timings.items()))
+    failed = False
+    loaded = sorted({m for r in results for m in r['loaded']})
+    if loaded:
+        print(f'eagerly loaded: {", ".join(loaded)}')
+        failed = True
+    if timings['import_bitswap'] + timings['construct'] > args.budget_ms:
+        print(f'over budget: {args.budget_ms} ms')
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""Serving strategy benchmark.
+
+Simulates a set of peers with endless task queues and reports how each
+strategy splits served bytes between them and how fast it selects peers.
+Peers are grouped into cohorts by how many bytes they sent us; for each
+cohort the share of served bytes is printed next to its share of peers.
+Metrics cover the measured rounds only, after an unmeasured warm-up that
+lets debt-based weights reach steady state.
+
+Run from the repository root: python -m benchmarks.strategy_benchmark
+"""
+from typing import List, Dict
+from collections import Counter
+from argparse import ArgumentParser
+from random import Random
+from time import perf_counter
+
+from bitswap.strategy.base_strategy import BaseStrategy
+from bitswap.strategy.peer_rank_strategy import PeerRankStrategy
+from bitswap.strategy.deficit_round_robin_strategy import DeficitRoundRobinStrategy
+
+
+class _Queue:
+
+    def __init__(self, size: int = 0) -> None:
+        self.size = size
+
+    def qsize(self) -> int:
+        return self.size
+
+
+class SimPeer:
+
+    def __init__(self, name: str, block_size: int, bytes_receive: int) -> None:
+        self.cid = name
+        self.block_size = block_size
+        self.bytes_receive = bytes_receive
+        self.bytes_send = 0
+        self.response_queue = _Queue()
+        self.tasks_queue = _Queue(1)
+
+    @property
+    def peer_rank(self) -> float:
+        if self.bytes_receive == 0:
+            return 0
+        return self.bytes_receive / (self.bytes_send + self.bytes_receive)
+
+    @property
+    def debt_ratio(self) -> float:
+        return self.bytes_send / (self.bytes_receive + 1)
+
+
+def make_peers(count: int, seed: int) -> List[SimPeer]:
+    rnd = Random(seed)
+    peers = []
+    for i in range(count):
+        block_size = rnd.choice((1024, 64 * 1024, 256 * 1024, 1024 * 1024))
+        bytes_receive = rnd.choice((0, 0, 1024 * 1024, 64 * 1024 * 1024))
+        peers.append(SimPeer(f'peer-{i}', block_size, bytes_receive))
+    return peers
+
+
+def serve(strategy: BaseStrategy, peers: List[SimPeer], rounds: int) -> None:
+    for _ in range(rounds):
+        peer = strategy.select_peer(peers)
+        peer.bytes_send += peer.block_size
+        strategy.served(peer, peer.block_size)
+
+
+def run(strategy: BaseStrategy, peers: List[SimPeer], rounds: int, warmup: int = 0) -> Dict[str, float]:
+    serve(strategy, peers, warmup)
+    before = [p.bytes_send for p in peers]
+    start = perf_counter()
+    serve(strategy, peers, rounds)
+    elapsed = perf_counter() - start
+    sent = [p.bytes_send - b for p, b in zip(peers, before)]
+    total = sum(sent)
+    result = {
+        'selects_per_sec': rounds / elapsed,
+        'served_peers': sum(1 for s in sent if s > 0) / len(peers),
+        'jain_fairness': total * total / (len(sent) * sum(s * s for s in sent)) if total else 0,
+        'reciprocating_share': sum(s for p, s in zip(peers, sent) if p.bytes_receive) / total if total else 0,
+        'reciprocating_population': sum(1 for p in peers if p.bytes_receive) / len(peers),
+    }
+    population = Counter(p.bytes_receive for p in peers)
+    shares: Counter = Counter()
+    for p, s in zip(peers, sent):
+        shares[p.bytes_receive] += s
+    for bytes_receive in sorted(population):
+        name = f'recv_{bytes_receive // (1024 * 1024)}mib'
+        result[f'{name}_share'] = shares[bytes_receive] / total if total else 0
+        result[f'{name}_population'] = population[bytes_receive] / len(peers)
+    return result
+
+
+def main() -> None:
+    parser = ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--peers', type=int, default=200)
+    parser.add_argument('--rounds', type=int, default=20000)
+    parser.add_argument('--warmup', type=int, default=50000)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+    for name, strategy in (('peer_rank', PeerRankStrategy()), ('deficit_round_robin', DeficitRoundRobinStrategy())):
+        result = run(strategy, make_peers(args.peers, args.seed), args.rounds, args.warmup)
+        print(name, ' '.join(f'{k}={v:.3f}' for k, v in result.items()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+"""Memory cost of tracking remote wants.
+
+Fills peer ledgers with want-block entries, the way PeerManager does for
+connected peers, and reports traced bytes per tracked want for the compact
+RemoteEntry record and for the local Entry record it replaced.
+
+Run from the repository root: python -m benchmarks.want_memory
+"""
+from typing import Callable, List
+from argparse import ArgumentParser
+import asyncio
+import gc
+import hashlib
+import time
+import tracemalloc
+
+import multihash
+from cid import make_cid
+
+from bitswap.decision.ledger import Ledger
+from bitswap.message.proto_buff import ProtoBuff
+from bitswap.wantlist.entry import Entry
+from bitswap.wantlist.remote_entry import RemoteEntry
+from bitswap.wantlist.wantlist import WantList
+
+
+def make_cids(count: int) -> List:
+    return [make_cid(1, 'raw', multihash.encode(hashlib.sha256(i.to_bytes(8, 'big')).digest(), 'sha2-256'))
+            for i in range(count)]
+
+
+def measure(entry_factory: Callable, cids: List, peers: int) -> None:
+    want_type = ProtoBuff.WantType.Block
+    start = time.perf_counter()
+    for _ in range(peers):
+        [entry_factory(cid, 1, want_type) for cid in cids]
+    alloc_ns = (time.perf_counter() - start) / (peers * len(cids)) * 1e9
+    gc.collect()
+    tracemalloc.start()
+    ledgers = []
+    for _ in range(peers):
+        ledger = Ledger(WantList(entry_factory))
+        for cid in cids:
+            ledger.wants(cid, 1, want_type)
+        ledgers.append(ledger)
+    traced, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    wants = peers * len(cids)
+    print(f'{entry_factory.__name__:>12}: wants={wants} bytes_per_want={traced / wants:.1f} '
+          f'alloc_ns_per_entry={alloc_ns:.0f}')
+
+
+async def main() -> None:
+    parser = ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--peers', type=int, default=100)
+    parser.add_argument('--wants', type=int, default=1000)
+    args = parser.parse_args()
+    cids = make_cids(args.wants)
+    for entry_factory in (RemoteEntry, Entry):
+        measure(entry_factory, cids, args.peers)
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
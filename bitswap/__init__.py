@@ -1,4 +1,25 @@
-from .bitswap import Bitswap
-from .network.base_network import BaseNetwork
-from .network.base_peer import BasePeer
-from .block_storage.base_block_storage import BaseBlockStorage
+from typing import Any, TYPE_CHECKING
+from importlib import import_module
+
+if TYPE_CHECKING:
+    from .bitswap import Bitswap
+    from .network.base_network import BaseNetwork
+    from .network.base_peer import BasePeer
+    from .block_storage.base_block_storage import BaseBlockStorage
+
+__all__ = ['Bitswap', 'BaseNetwork', 'BasePeer', 'BaseBlockStorage']
+
+_exports = {
+    'Bitswap': '.bitswap',
+    'BaseNetwork': '.network.base_network',
+    'BasePeer': '.network.base_peer',
+    'BaseBlockStorage': '.block_storage.base_block_storage',
+}
+
+
+def __getattr__(name: str) -> Any:
+    if name not in _exports:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+    value = getattr(import_module(_exports[name], __name__), name)
+    globals()[name] = value
+    return value
@@ -0,0 +1,82 @@
+from typing import Union, Optional, Dict, Set, Tuple
+
+from cid import CIDv0, CIDv1
+
+from .base_bandwidth_manager import BaseBandwidthManager
+from .token_bucket import TokenBucket
+
+
+class BandwidthManager(BaseBandwidthManager):
+
+    BLOCK = 'block'
+    PRESENCE = 'presence'
+    WANT = 'want'
+
+    def __init__(self, global_rate: Optional[float] = None, peer_rate: Optional[float] = None,
+                 class_rates: Optional[Dict[str, float]] = None, exempt_classes: Tuple[str, ...] = (WANT,)) -> None:
+        self._global = TokenBucket(global_rate)
+        self._peer_rate = peer_rate
+        self._peers: Dict[str, TokenBucket] = {}
+        self._peer_overrides: Set[str] = set()
+        self._classes: Dict[str, TokenBucket] = {}
+        self._exempt_classes = set(exempt_classes)
+        if class_rates is not None:
+            for priority_class, rate in class_rates.items():
+                self.set_class_rate(priority_class, rate)
+
+    @property
+    def global_rate(self) -> Optional[float]:
+        return self._global.rate
+
+    @property
+    def peer_rate(self) -> Optional[float]:
+        return self._peer_rate
+
+    async def throttle(self, peer_cid: Union[CIDv0, CIDv1], size: int, priority_class: str) -> None:
+        class_bucket = self._classes.get(priority_class)
+        if class_bucket is not None:
+            await class_bucket.consume(size)
+        if priority_class in self._exempt_classes:
+            return
+        await self._get_peer_bucket(str(peer_cid)).consume(size)
+        await self._global.consume(size)
+
+    def set_global_rate(self, rate: Optional[float], burst: Optional[float] = None) -> None:
+        self._global.set_rate(rate, burst)
+
+    def set_peer_rate(self, peer_cid: Optional[Union[CIDv0, CIDv1]], rate: Optional[float],
+                      burst: Optional[float] = None) -> None:
+        if peer_cid is None:
+            self._peer_rate = rate
+            for str_peer_cid, bucket in self._peers.items():
+                if str_peer_cid not in self._peer_overrides:
+                    bucket.set_rate(rate, burst)
+        else:
+            str_peer_cid = str(peer_cid)
+            self._peer_overrides.add(str_peer_cid)
+            self._get_peer_bucket(str_peer_cid).set_rate(rate, burst)
+
+    def set_class_rate(self, priority_class: str, rate: Optional[float], burst: Optional[float] = None) -> None:
+        bucket = self._classes.get(priority_class)
+        if bucket is None:
+            self._classes[priority_class] = TokenBucket(rate, burst)
+        else:
+            bucket.set_rate(rate, burst)
+
+    def remove_peer(self, peer_cid: Union[CIDv0, CIDv1]) -> None:
+        str_peer_cid = str(peer_cid)
+        self._peers.pop(str_peer_cid, None)
+        self._peer_overrides.discard(str_peer_cid)
+
+    def pending_bytes(self, peer_cid: Optional[Union[CIDv0, CIDv1]] = None) -> int:
+        if peer_cid is None:
+            return self._global.pending + sum(b.pending for b in self._peers.values()) + \
+                sum(b.pending for b in self._classes.values())
+        bucket = self._peers.get(str(peer_cid))
+        return 0 if bucket is None else bucket.pending
+
+    def _get_peer_bucket(self, str_peer_cid: str) -> TokenBucket:
+        bucket = self._peers.get(str_peer_cid)
+        if bucket is None:
+            bucket = self._peers[str_peer_cid] = TokenBucket(self._peer_rate)
+        return bucket
@@ -0,0 +1,32 @@
+from abc import ABCMeta, abstractmethod
+from typing import Union, Optional
+
+from cid import CIDv0, CIDv1
+
+
+class BaseBandwidthManager(metaclass=ABCMeta):
+
+    @abstractmethod
+    async def throttle(self, peer_cid: Union[CIDv0, CIDv1], size: int, priority_class: str) -> None:
+        pass
+
+    @abstractmethod
+    def set_global_rate(self, rate: Optional[float], burst: Optional[float] = None) -> None:
+        pass
+
+    @abstractmethod
+    def set_peer_rate(self, peer_cid: Optional[Union[CIDv0, CIDv1]], rate: Optional[float],
+                      burst: Optional[float] = None) -> None:
+        pass
+
+    @abstractmethod
+    def set_class_rate(self, priority_class: str, rate: Optional[float], burst: Optional[float] = None) -> None:
+        pass
+
+    @abstractmethod
+    def remove_peer(self, peer_cid: Union[CIDv0, CIDv1]) -> None:
+        pass
+
+    @abstractmethod
+    def pending_bytes(self, peer_cid: Optional[Union[CIDv0, CIDv1]] = None) -> int:
+        pass
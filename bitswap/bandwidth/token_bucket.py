@@ -0,0 +1,53 @@
+from typing import Optional
+from time import monotonic
+import asyncio
+
+
+class TokenBucket:
+
+    def __init__(self, rate: Optional[float] = None, burst: Optional[float] = None) -> None:
+        self._rate: Optional[float] = None
+        self._burst: float = 0
+        self._tokens: float = 0
+        self._last = monotonic()
+        self.pending = 0
+        self.set_rate(rate, burst)
+
+    @property
+    def rate(self) -> Optional[float]:
+        return self._rate
+
+    @property
+    def tokens(self) -> float:
+        self._refill()
+        return self._tokens
+
+    def set_rate(self, rate: Optional[float], burst: Optional[float] = None) -> None:
+        if rate is not None and rate <= 0:
+            raise ValueError(f'rate must be positive or None, rate: {rate}')
+        self._refill()
+        unlimited = self._rate is None
+        self._rate = rate
+        self._burst = burst if burst is not None else (rate if rate is not None else 0)
+        self._tokens = self._burst if unlimited else min(self._tokens, self._burst)
+
+    async def consume(self, size: int) -> None:
+        if self._rate is None:
+            return
+        self.pending += size
+        try:
+            while self._rate is not None:
+                self._refill()
+                need = min(size, self._burst)
+                if self._tokens >= need:
+                    self._tokens -= size
+                    return
+                await asyncio.sleep((need - self._tokens) / self._rate)
+        finally:
+            self.pending -= size
+
+    def _refill(self) -> None:
+        now = monotonic()
+        if self._rate is not None:
+            self._tokens = min(self._tokens + (now - self._last) * self._rate, self._burst)
+        self._last = now
@@ -1,26 +1,39 @@
-from typing import Union, Any, Optional, TYPE_CHECKING
+from typing import Union, Any, Optional, Dict, Tuple, Callable, Hashable, TYPE_CHECKING
 import logging
 import asyncio
+from types import SimpleNamespace
 from functools import partial
 
-from cid import CIDv0, CIDv1
+from cid import CIDv0, CIDv1, make_cid
 
 from .base_bitswap import BaseBitswap
-from .logger import get_stream_logger_colored, get_concurrent_logger
+from .logger import get_stream_logger_colored, get_concurrent_logger, set_log_sample_rate
 from .session.session import Session
 from .session.session_manager import SessionManager
 from .decision.ledger import Ledger
 from .decision.decision import Decision
 from .decision.engine import Engine
 from .wantlist.wantlist import WantList
+from .wantlist.wantlist_journal import WantListJournal
 from .message.proto_buff import ProtoBuff
 from .peer.peer_manager import PeerManager
 from .connection_manager.connection_manager import ConnectionManager
+from .provider.provider_cache import ProviderCache
+from .bandwidth.bandwidth_manager import BandwidthManager
+from .snapshot.peer_snapshot import PeerSnapshot
 from .task.task import Task
+from .task.task_supervisor import TaskSupervisor
+from .sharding.shard_pool import ShardPool
+from .scheduler.fetch_scheduler import FetchScheduler
+from .presence.presence_index import PresenceIndex
+from .block_storage.storage_manager import StorageManager
+from .block_storage.block_writer import BlockWriter
 
 if TYPE_CHECKING:
     from network import BaseNetwork
     from block_storage import BaseBlockStorage
+    from strategy.base_strategy import BaseStrategy
+    from .wantlist.entry import Entry
 
 
 class Bitswap(BaseBitswap):
@@ -29,21 +42,129 @@ class Bitswap(BaseBitswap):
                  log_level: int = logging.INFO, log_path: Optional[str] = None,
                  max_block_size_have_to_block: int = 1024, task_wait_timeout: float = 0.5,
                  decision_sleep_timeout: float = 0.1, term_score: float = 10, alpha_score: float = 0.5,
-                 max_no_active_time: int = 3600, check_no_active_ping_period: int = 30) -> None:
-        if log_path is None:
-            self._logger = get_stream_logger_colored(__name__, log_level)
-        else:
-            self._logger = get_concurrent_logger(__name__, log_path, log_level)
+                 max_no_active_time: int = 3600, check_no_active_ping_period: int = 30,
+                 provider_ttl: float = 600, provider_negative_ttl: float = 30,
+                 provider_cache_size: int = 10000, peers_low_water: int = 600, peers_high_water: int = 900,
+                 max_peers: Optional[int] = None, peers_grace_period: float = 30,
+                 peers_trim_period: float = 60, max_concurrent_pings: int = 32, ping_timeout: float = 10,
+                 ping_jitter: float = 0.2, max_peer_queue_bytes: Optional[int] = 8 * 1024 * 1024,
+                 max_queue_bytes: Optional[int] = 256 * 1024 * 1024, max_peer_tasks: int = 4096,
+                 upload_rate: Optional[float] = None, peer_upload_rate: Optional[float] = None,
+                 upload_class_rates: Optional[Dict[str, float]] = None,
+                 serving_strategy: Optional['BaseStrategy'] = None, snapshot_path: Optional[str] = None,
+                 snapshot_period: float = 300, snapshot_half_life: float = 3600,
+                 wantlist_journal_path: Optional[str] = None, log_sample_rate: int = 1,
+                 task_group_limits: Optional[Dict[str, Tuple[Optional[int], Optional[int]]]] = None,
+                 shutdown_timeout: float = 5, shard_workers: int = 0,
+                 block_storage_factory: Optional[Callable[[], 'BaseBlockStorage']] = None,
+                 max_concurrent_fetches: int = 128, max_fetch_bytes_in_flight: Optional[int] = 128 * 1024 * 1024,
+                 interactive_fetch_reserve: int = 16, session_idle_timeout: float = 300,
+                 max_keyed_sessions: int = 1024, want_fanout: int = 8, want_fanout_factor: float = 2,
+                 want_fanout_min_timeout: float = 0.25, want_fanout_max_timeout: float = 1,
+                 optimistic_hit_rate: Optional[float] = 0.8, optimistic_min_samples: int = 2,
+                 presence_ttl: float = 600, presence_index_size: int = 100000,
+                 storage_quota: Optional[int] = None, storage_gc_period: float = 60,
+                 storage_index_path: Optional[str] = None,
+                 block_write_batch: int = 64, block_write_queue: int = 1024,
+                 block_write_interval: float = 0.05, max_session_peers: Optional[int] = 256,
+                 session_peer_idle_timeout: Optional[float] = 600) -> None:
+        if shard_workers and block_storage_factory is None:
+            raise ValueError('block_storage_factory is required when shard_workers > 0')
+        if want_fanout < 1:
+            raise ValueError(f'want_fanout: {want_fanout} < 1')
+        if want_fanout_factor <= 1:
+            raise ValueError(f'want_fanout_factor: {want_fanout_factor} <= 1')
+        options = {k: v for k, v in locals().items() if k not in ('self', 'network', 'block_storage')}
         self._network = network
         self._block_storage = block_storage
+        self._options = SimpleNamespace(**options)
+        self._built = False
+
+    def _build(self) -> None:
+        if self._built:
+            return
+        o = self._options
+        set_log_sample_rate(o.log_sample_rate)
+        if o.log_path is None:
+            self._logger = get_stream_logger_colored(__name__, o.log_level)
+        else:
+            self._logger = get_concurrent_logger(__name__, o.log_path, o.log_level)
+        self._storage_manager: Optional[StorageManager] = None
+        if o.storage_quota is not None:
+            self._storage_manager = StorageManager(self._block_storage, o.storage_quota, gc_period=o.storage_gc_period,
+                                                   index_path=o.storage_index_path, log_level=o.log_level,
+                                                   log_path=o.log_path)
+            self._block_storage = self._storage_manager
+        self._block_writer = BlockWriter(self._block_storage, o.block_write_batch, o.block_write_queue,
+                                         o.block_write_interval, o.log_level, o.log_path)
+        self._task_supervisor = TaskSupervisor(o.task_group_limits, o.log_level, o.log_path)
+        self._fetch_scheduler = FetchScheduler(o.max_concurrent_fetches, o.max_fetch_bytes_in_flight,
+                                               o.interactive_fetch_reserve, log_level=o.log_level,
+                                               log_path=o.log_path)
         self._local_ledger = Ledger(WantList())
-        self._session_manager = SessionManager(log_level, log_path)
-        self._engine = Engine(self._local_ledger, term_score, alpha_score, log_level, log_path)
-        self._connection_manager = ConnectionManager(self._session_manager, self._engine, log_level, log_path)
-        self._peer_manager = PeerManager(self._connection_manager, self._network, max_no_active_time,
-                                         check_no_active_ping_period, log_level, log_path)
-        self._decision = Decision(self._block_storage, self._peer_manager, max_block_size_have_to_block,
-                                  task_wait_timeout, decision_sleep_timeout, log_level, log_path)
+        self._provider_cache = ProviderCache(self._network, o.provider_ttl, o.provider_negative_ttl,
+                                             o.provider_cache_size, o.log_level, o.log_path)
+        self._presence_index = PresenceIndex(o.presence_ttl, o.presence_index_size)
+        self._session_manager = SessionManager(o.log_level, o.log_path, self._provider_cache,
+                                               o.session_idle_timeout, o.max_keyed_sessions, o.want_fanout,
+                                               o.want_fanout_factor, o.want_fanout_min_timeout,
+                                               o.want_fanout_max_timeout, o.optimistic_hit_rate,
+                                               o.optimistic_min_samples, self._presence_index,
+                                               o.max_session_peers, o.session_peer_idle_timeout)
+        self._engine = Engine(self._local_ledger, o.term_score, o.alpha_score, o.log_level, o.log_path,
+                              self._provider_cache, self._task_supervisor, self._presence_index,
+                              self._block_writer)
+        self._bandwidth_manager = BandwidthManager(o.upload_rate, o.peer_upload_rate, o.upload_class_rates)
+        self._shard_pool: Optional[ShardPool] = None
+        if o.shard_workers:
+            self._shard_pool = ShardPool(self._engine, o.block_storage_factory, o.shard_workers,
+                                         o.max_block_size_have_to_block, log_level=o.log_level, log_path=o.log_path)
+        self._connection_manager = ConnectionManager(self._session_manager, self._engine, o.log_level, o.log_path,
+                                                     bandwidth_manager=self._bandwidth_manager,
+                                                     shard_pool=self._shard_pool)
+        self._peer_manager = PeerManager(self._connection_manager, self._network, o.max_no_active_time,
+                                         o.check_no_active_ping_period, o.log_level, o.log_path,
+                                         self._session_manager, o.peers_low_water, o.peers_high_water, o.max_peers,
+                                         o.peers_grace_period, o.peers_trim_period, o.max_concurrent_pings,
+                                         o.ping_timeout, o.ping_jitter, o.max_peer_queue_bytes, o.max_queue_bytes,
+                                         o.max_peer_tasks)
+        self._decision = Decision(self._block_storage, self._peer_manager, o.max_block_size_have_to_block,
+                                  o.task_wait_timeout, o.decision_sleep_timeout, o.log_level, o.log_path,
+                                  o.serving_strategy)
+        self._snapshot: Optional[PeerSnapshot] = None
+        if o.snapshot_path is not None:
+            self._snapshot = PeerSnapshot(o.snapshot_path, self._peer_manager, self._provider_cache,
+                                          o.snapshot_period, o.snapshot_half_life, o.log_level, o.log_path)
+        self._journal: Optional[WantListJournal] = None
+        if o.wantlist_journal_path is not None:
+            self._journal = WantListJournal(o.wantlist_journal_path)
+        self._resume_task: Optional[asyncio.Task] = None
+        self._built = True
+
+    @property
+    def bandwidth_manager(self) -> BandwidthManager:
+        self._build()
+        return self._bandwidth_manager
+
+    @property
+    def storage_manager(self) -> Optional[StorageManager]:
+        self._build()
+        return self._storage_manager
+
+    @property
+    def block_writer(self) -> BlockWriter:
+        self._build()
+        return self._block_writer
+
+    @property
+    def fetch_scheduler(self) -> FetchScheduler:
+        self._build()
+        return self._fetch_scheduler
+
+    @property
+    def task_supervisor(self) -> TaskSupervisor:
+        self._build()
+        return self._task_supervisor
 
     async def __aenter__(self) -> 'Bitswap':
         await self.run()
@@ -53,17 +174,55 @@ class Bitswap(BaseBitswap):
         await self.stop()
 
     async def run(self):
+        self._build()
+        self._task_supervisor.reopen()
+        if self._journal is not None:
+            self._journal.open()
+        if self._snapshot is not None:
+            await self._snapshot.load()
+            self._snapshot.run()
         self._peer_manager.run()
-        self._decision.run()
+        self._block_writer.run()
+        if self._storage_manager is not None:
+            await self._storage_manager.load()
+            self._storage_manager.run()
+        if self._shard_pool is None:
+            self._decision.run()
+        else:
+            self._shard_pool.run(self._peer_manager)
         self._connection_manager.run_handle_conn(self._network, self._peer_manager)
+        if self._journal is not None:
+            self._resume_task = Task.create_task(self._resume_wants(), partial(Task.base_callback, logger=self._logger))
 
     async def stop(self):
+        if not self._built:
+            return
+        if self._resume_task is not None:
+            self._resume_task.cancel()
+            self._resume_task = None
+        await self._task_supervisor.shutdown(self._options.shutdown_timeout)
+        if self._journal is not None:
+            await self._journal.close()
         self._peer_manager.stop()
-        self._decision.stop()
+        await self._block_writer.stop()
+        if self._storage_manager is not None:
+            self._storage_manager.stop()
+            await self._storage_manager.save()
+        if self._shard_pool is None:
+            self._decision.stop()
         self._connection_manager.stop_handle_conn()
         await self._peer_manager.disconnect()
+        if self._shard_pool is not None:
+            await self._shard_pool.stop()
+        if self._snapshot is not None:
+            self._snapshot.stop()
+            await self._snapshot.save()
 
-    async def put(self, cid: Union[CIDv0, CIDv1], block: bytes) -> bool:
+    async def put(self, cid: Union[CIDv0, CIDv1], block: bytes,
+                  root: Optional[Union[CIDv0, CIDv1]] = None) -> bool:
+        self._build()
+        if self._storage_manager is not None and root is not None:
+            self._storage_manager.associate(cid, root)
         if not self._block_storage.has(cid):
             await self._block_storage.put(cid, block)
             await self._network.public(cid)
@@ -73,33 +232,124 @@ class Bitswap(BaseBitswap):
 
     async def get(self, cid: Union[CIDv0, CIDv1], priority: int = 1, timeout: int = 60,
                   session: Optional[Session] = None, connect_timeout: int = 7,
-                  peer_act_timeout: int = 5, ban_peer_timeout: int = 10) -> Optional[bytes]:
+                  peer_act_timeout: int = 5, ban_peer_timeout: int = 10,
+                  root: Optional[Union[CIDv0, CIDv1]] = None,
+                  fetch_class: str = FetchScheduler.NORMAL,
+                  session_key: Optional[Hashable] = None) -> Optional[bytes]:
+        if fetch_class not in FetchScheduler.CLASSES:
+            raise ValueError(f'Unknown fetch class: {fetch_class}')
+        self._build()
+        if self._storage_manager is None:
+            return await self._get(cid, priority, timeout, session, connect_timeout, peer_act_timeout,
+                                   ban_peer_timeout, root, fetch_class, session_key)
+        self._storage_manager.hold(cid)
+        try:
+            return await self._get(cid, priority, timeout, session, connect_timeout, peer_act_timeout,
+                                   ban_peer_timeout, root, fetch_class, session_key)
+        finally:
+            self._storage_manager.release(cid)
+
+    async def _get(self, cid: Union[CIDv0, CIDv1], priority: int, timeout: int, session: Optional[Session],
+                   connect_timeout: int, peer_act_timeout: int, ban_peer_timeout: int,
+                   root: Optional[Union[CIDv0, CIDv1]], fetch_class: str, session_key: Optional[Hashable],
+                   refetch: bool = True) -> Optional[bytes]:
         if self._block_storage.has(cid):
-            self._logger.info(f'Get block from block storage, block_cid: {cid}')
+            self._logger.debug('Get block from block storage, block_cid: %s', cid)
             return await self._block_storage.get(cid)
+        block = self._block_writer.get(cid)
+        if block is not None:
+            self._logger.debug('Get block from block writer, block_cid: %s', cid)
+            return block
         if session is None:
-            session = self._session_manager.create_session(self._network, self._peer_manager)
+            if session_key is None and root is not None:
+                session_key = ('root', str(root))
+            if session_key is None:
+                session = self._session_manager.create_session(self._network, self._peer_manager)
+            else:
+                session = self._session_manager.get_session(session_key, self._network, self._peer_manager)
+        if self._storage_manager is not None and root is not None:
+            self._storage_manager.associate(cid, root)
         entry = self._local_ledger.get_entry(cid)
+        if entry is not None and entry.has_block:
+            block = await self._get_entry_block(entry)
+            if block is not None:
+                self._logger.debug('Get block from local ledger, block_cid: %s', cid)
+                self._local_ledger.cancel_want(entry.cid)
+                return block
         if entry is None:
             self._local_ledger.wants(cid, priority, ProtoBuff.WantType.Block)
             entry = self._local_ledger.get_entry(cid)
-        elif entry.block is not None:
-            self._logger.info(f'Get block from local ledger, block_cid: {cid}')
-            block = entry.block
-            self._local_ledger.cancel_want(entry.cid)
-            return block
         elif entry.want_type == ProtoBuff.WantType.Have or entry.priority != priority:
             entry.priority = priority
             entry.want_type = ProtoBuff.WantType.Block
-        session_get_task = Task.create_task(session.get(entry, connect_timeout, peer_act_timeout, ban_peer_timeout),
-                                            partial(Task.base_callback, logger=self._logger))
+        if self._journal is not None:
+            self._journal.want(cid, priority, ProtoBuff.WantType.Block, root)
+        deadline = asyncio.get_running_loop().time() + timeout
+        session_get_task = None
         try:
-            await asyncio.wait_for(entry.block_event.wait(), timeout)
+            await asyncio.wait_for(self._task_supervisor.wait_capacity(TaskSupervisor.SESSION), timeout)
+            session_get_task = self._task_supervisor.spawn(
+                TaskSupervisor.SESSION, self._session_get(session, entry, connect_timeout, peer_act_timeout,
+                                                          ban_peer_timeout, root, fetch_class, priority))
+            await asyncio.wait_for(entry.block_event.wait(), deadline - asyncio.get_running_loop().time())
         except asyncio.exceptions.TimeoutError:
-            self._logger.warning(f'Get timeout, block_cid: {cid}')
-        session_get_task.cancel()
-        block = entry.block
+            self._logger.warning('Get timeout, block_cid: %s', cid)
+        finally:
+            if session_get_task is not None:
+                session_get_task.cancel()
+        block = None
+        if entry.has_block:
+            block = await self._get_entry_block(entry)
+            if block is None and refetch:
+                return await self._get(cid, priority, timeout, session, connect_timeout, peer_act_timeout,
+                                       ban_peer_timeout, root, fetch_class, session_key, False)
         if block is not None:
             self._local_ledger.cancel_want(entry.cid)
-            self._logger.info(f'Session found block, block_cid: {cid}')
+            self._fetch_scheduler.observe(len(block))
+            self._logger.debug('Session found block, block_cid: %s', cid)
+            if self._journal is not None:
+                self._journal.done(cid)
         return block
+
+    def cancel(self, cid: Union[CIDv0, CIDv1]) -> bool:
+        self._build()
+        if self._journal is not None:
+            self._journal.done(cid)
+        return self._local_ledger.cancel_want(cid)
+
+    async def _get_entry_block(self, entry: 'Entry') -> Optional[bytes]:
+        block = entry.block
+        if block is None:
+            try:
+                return await self._block_storage.get(entry.cid)
+            except Exception as e:
+                self._logger.warning('Released block missing from storage, refetch, block_cid: %s, e: %s',
+                                     entry.cid, e)
+                del entry.block
+                return
+        if not entry.persisted and not self._block_writer.is_pending(entry.cid) and \
+                not self._block_storage.has(entry.cid):
+            await self._block_storage.put(entry.cid, block)
+        return block
+
+    async def _session_get(self, session: Session, entry: 'Entry', connect_timeout: int, peer_act_timeout: int,
+                           ban_peer_timeout: int, root: Optional[Union[CIDv0, CIDv1]], fetch_class: str,
+                           priority: int) -> None:
+        await self._fetch_scheduler.run(session.get(entry, connect_timeout, peer_act_timeout, ban_peer_timeout, root),
+                                        session, fetch_class, priority)
+
+    async def _resume_wants(self) -> None:
+        wants = await self._journal.load()
+        self._logger.debug('Resume wants, count: %d', len(wants))
+        for str_cid, (priority, _, str_root_cid) in wants.items():
+            cid = make_cid(str_cid)
+            if self._block_storage.has(cid):
+                self._journal.done(cid)
+                continue
+            root = make_cid(str_root_cid) if str_root_cid is not None else None
+            await self._task_supervisor.wait_capacity(TaskSupervisor.RESUME)
+            self._task_supervisor.spawn(TaskSupervisor.RESUME, self._resume_want(cid, priority, root))
+
+    async def _resume_want(self, cid: Union[CIDv0, CIDv1], priority: int,
+                           root: Optional[Union[CIDv0, CIDv1]]) -> None:
+        await self.get(cid, priority, root=root, fetch_class=FetchScheduler.BULK)
@@ -0,0 +1,32 @@
+from abc import ABCMeta, abstractmethod
+from typing import Union, Optional, Callable
+
+from cid import CIDv0, CIDv1
+
+
+class BaseBlockWriter(metaclass=ABCMeta):
+
+    @abstractmethod
+    def run(self) -> None:
+        pass
+
+    @abstractmethod
+    async def stop(self) -> None:
+        pass
+
+    @abstractmethod
+    def submit(self, cid: Union[CIDv0, CIDv1], block: bytes,
+               callback: Optional[Callable[[], None]] = None) -> bool:
+        pass
+
+    @abstractmethod
+    def get(self, cid: Union[CIDv0, CIDv1]) -> Optional[bytes]:
+        pass
+
+    @abstractmethod
+    def is_pending(self, cid: Union[CIDv0, CIDv1]) -> bool:
+        pass
+
+    @abstractmethod
+    async def flush(self) -> int:
+        pass
@@ -0,0 +1,121 @@
+from typing import Union, Dict, List, Tuple, Optional, Callable, NoReturn, TYPE_CHECKING
+from collections import OrderedDict
+from itertools import islice
+from logging import INFO
+from functools import partial
+import asyncio
+
+from cid import CIDv0, CIDv1
+
+from .base_block_writer import BaseBlockWriter
+from ..task.task import Task
+from ..logger import get_stream_logger_colored, get_concurrent_logger
+
+if TYPE_CHECKING:
+    from .base_block_storage import BaseBlockStorage
+
+BlockKey = Tuple[int, str, bytes]
+
+
+class BlockWriter(BaseBlockWriter):
+
+    def __init__(self, block_storage: 'BaseBlockStorage', max_batch: int = 64, max_queue: int = 1024,
+                 flush_interval: float = 0.05, log_level: int = INFO, log_path: Optional[str] = None) -> None:
+        if log_path is None:
+            self._logger = get_stream_logger_colored(__name__, log_level)
+        else:
+            self._logger = get_concurrent_logger(__name__, log_path, log_level)
+        self._block_storage = block_storage
+        self._max_batch = max_batch
+        self._max_queue = max_queue
+        self._flush_interval = flush_interval
+        self._pending: 'OrderedDict[BlockKey, Tuple[Union[CIDv0, CIDv1], bytes, List[Callable[[], None]]]]' = \
+            OrderedDict()
+        self._flush_task: Optional[asyncio.Task] = None
+        self._flush_event: Optional[asyncio.Event] = None
+        self.written = 0
+        self.batches = 0
+        self.rejected = 0
+        self.failed = 0
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def run(self) -> None:
+        if self._flush_task is None:
+            self._flush_event = asyncio.Event()
+            self._flush_task = Task.create_task(self._flush_loop(), partial(Task.base_callback, logger=self._logger))
+
+    async def stop(self) -> None:
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.exceptions.CancelledError:
+                pass
+            self._flush_task = None
+        await self.flush()
+
+    def submit(self, cid: Union[CIDv0, CIDv1], block: bytes,
+               callback: Optional[Callable[[], None]] = None) -> bool:
+        key = BlockWriter._key(cid)
+        pending = self._pending.get(key)
+        if pending is None:
+            if len(self._pending) >= self._max_queue:
+                self.rejected += 1
+                self._logger.debug('Block writer queue is full, block_cid: %s', cid)
+                return False
+            pending = (cid, block, [])
+            self._pending[key] = pending
+        if callback is not None:
+            pending[2].append(callback)
+        if len(self._pending) >= self._max_batch and self._flush_event is not None:
+            self._flush_event.set()
+        return True
+
+    def get(self, cid: Union[CIDv0, CIDv1]) -> Optional[bytes]:
+        pending = self._pending.get(BlockWriter._key(cid))
+        return pending[1] if pending is not None else None
+
+    def is_pending(self, cid: Union[CIDv0, CIDv1]) -> bool:
+        return BlockWriter._key(cid) in self._pending
+
+    async def flush(self) -> int:
+        written = 0
+        while self._pending:
+            batch = list(islice(self._pending.items(), self._max_batch))
+            blocks: Dict[Union[CIDv0, CIDv1], bytes] = {cid: block for _, (cid, block, _) in batch}
+            try:
+                await self._block_storage.put_many(blocks)
+            except Exception as e:
+                self.failed += len(batch)
+                self._logger.warning('Cant write blocks, count: %d, e: %s', len(batch), e)
+                for key, _ in batch:
+                    self._pending.pop(key, None)
+                continue
+            self.batches += 1
+            for key, (_, _, callbacks) in batch:
+                self._pending.pop(key, None)
+                for callback in callbacks:
+                    callback()
+            written += len(batch)
+        self.written += written
+        return written
+
+    def stats(self) -> Dict[str, int]:
+        return {'pending': len(self._pending), 'written': self.written, 'batches': self.batches,
+                'rejected': self.rejected, 'failed': self.failed}
+
+    async def _flush_loop(self) -> NoReturn:
+        while True:
+            try:
+                await asyncio.wait_for(self._flush_event.wait(), self._flush_interval)
+            except asyncio.exceptions.TimeoutError:
+                pass
+            self._flush_event.clear()
+            if self._pending:
+                await self.flush()
+
+    @staticmethod
+    def _key(cid: Union[CIDv0, CIDv1]) -> BlockKey:
+        return cid.version, cid.codec, cid.multihash
@@ -0,0 +1,251 @@
+from typing import Union, Dict, Tuple, Optional, Any, NoReturn
+from collections import OrderedDict
+from logging import INFO
+from functools import partial
+import asyncio
+import json
+import os
+
+from cid import CIDv0, CIDv1, make_cid
+
+from .base_block_storage import BaseBlockStorage
+from ..task.task import Task
+from ..logger import get_stream_logger_colored, get_concurrent_logger
+
+BlockKey = Tuple[int, str, bytes]
+
+
+class StorageManager(BaseBlockStorage):
+
+    version = 1
+
+    def __init__(self, block_storage: BaseBlockStorage, quota: Optional[int] = None, low_water: float = 0.9,
+                 gc_period: float = 60, index_path: Optional[str] = None, log_level: int = INFO,
+                 log_path: Optional[str] = None) -> None:
+        if log_path is None:
+            self._logger = get_stream_logger_colored(__name__, log_level)
+        else:
+            self._logger = get_concurrent_logger(__name__, log_path, log_level)
+        self._block_storage = block_storage
+        self.quota = quota
+        self._low_water = low_water
+        self._gc_period = gc_period
+        self._index_path = index_path
+        self._blocks: 'OrderedDict[BlockKey, Tuple[Union[CIDv0, CIDv1], int]]' = OrderedDict()
+        self._pins: Dict[BlockKey, Union[CIDv0, CIDv1]] = {}
+        self._pinned_roots: Dict[BlockKey, Union[CIDv0, CIDv1]] = {}
+        self._holds: Dict[BlockKey, int] = {}
+        self._roots: Dict[BlockKey, Dict[BlockKey, Union[CIDv0, CIDv1]]] = {}
+        self.used = 0
+        self._dirty = False
+        self._gc_task: Optional[asyncio.Task] = None
+        self._gc_event: Optional[asyncio.Event] = None
+
+    def __len__(self) -> int:
+        return len(self._blocks)
+
+    def run(self) -> None:
+        if self._gc_task is None:
+            self._gc_event = asyncio.Event()
+            self._gc_task = Task.create_task(self._gc_loop(), partial(Task.base_callback, logger=self._logger))
+
+    def stop(self) -> None:
+        if self._gc_task is not None:
+            self._gc_task.cancel()
+            self._gc_task = None
+
+    async def load(self) -> bool:
+        if self._index_path is None:
+            return False
+        try:
+            index = await asyncio.get_running_loop().run_in_executor(None, self._read)
+        except FileNotFoundError:
+            self._logger.debug('No storage index, path: %s', self._index_path)
+            return False
+        except Exception as e:
+            self._logger.warning('Cant read storage index, path: %s, e: %s', self._index_path, e)
+            return False
+        if index.get('v') != self.version:
+            self._logger.warning('Unknown storage index version, version: %s', index.get('v'))
+            return False
+        for str_cid, size in index['b']:
+            cid = make_cid(str_cid)
+            if self._block_storage.has(cid):
+                self.track(cid, size)
+        for str_cid in index['p']:
+            self.pin(make_cid(str_cid))
+        for str_cid in index['r']:
+            self.pin_root(make_cid(str_cid))
+        for str_cid, str_roots in index['a'].items():
+            cid = make_cid(str_cid)
+            for str_root in str_roots:
+                self.associate(cid, make_cid(str_root))
+        self._dirty = False
+        self._logger.debug('Load storage index, blocks: %d, used: %d', len(self._blocks), self.used)
+        return True
+
+    async def save(self) -> None:
+        if self._index_path is None:
+            return
+        index = {
+            'v': self.version,
+            'b': [(str(cid), size) for cid, size in self._blocks.values()],
+            'p': [str(cid) for cid in self._pins.values()],
+            'r': [str(cid) for cid in self._pinned_roots.values()],
+            'a': {str(self._blocks[key][0]): [str(root) for root in roots.values()]
+                  for key, roots in self._roots.items() if key in self._blocks},
+        }
+        self._dirty = False
+        await asyncio.get_running_loop().run_in_executor(None, self._write, index)
+        self._logger.debug('Save storage index, blocks: %d', len(index['b']))
+
+    async def get(self, cid: Union[CIDv0, CIDv1]) -> bytes:
+        key = StorageManager._key(cid)
+        if key in self._blocks:
+            self._blocks.move_to_end(key)
+        return await self._block_storage.get(cid)
+
+    async def put(self, cid: Union[CIDv0, CIDv1], block: bytes) -> None:
+        await self._block_storage.put(cid, block)
+        self.track(cid, len(block))
+
+    async def put_many(self, blocks: Dict[Union[CIDv0, CIDv1], bytes]) -> None:
+        await self._block_storage.put_many(blocks)
+        for cid, block in blocks.items():
+            self.track(cid, len(block))
+
+    async def delete(self, cid: Union[CIDv0, CIDv1]) -> None:
+        await self._block_storage.delete(cid)
+        self._untrack(StorageManager._key(cid))
+
+    def has(self, cid: Union[CIDv0, CIDv1]) -> bool:
+        return self._block_storage.has(cid)
+
+    async def size(self, cid: Union[CIDv0, CIDv1]) -> int:
+        tracked = self._blocks.get(StorageManager._key(cid))
+        if tracked is not None:
+            return tracked[1]
+        return await self._block_storage.size(cid)
+
+    def track(self, cid: Union[CIDv0, CIDv1], size: int) -> None:
+        key = StorageManager._key(cid)
+        tracked = self._blocks.get(key)
+        if tracked is not None:
+            self.used -= tracked[1]
+        self._blocks[key] = (cid, size)
+        self._blocks.move_to_end(key)
+        self.used += size
+        self._dirty = True
+        if self.quota is not None and self.used > self.quota and self._gc_event is not None:
+            self._gc_event.set()
+
+    def associate(self, cid: Union[CIDv0, CIDv1], root_cid: Union[CIDv0, CIDv1]) -> None:
+        key = StorageManager._key(cid)
+        if key not in self._roots:
+            self._roots[key] = {}
+        self._roots[key][StorageManager._key(root_cid)] = root_cid
+        self._dirty = True
+
+    def pin(self, cid: Union[CIDv0, CIDv1]) -> None:
+        self._pins[StorageManager._key(cid)] = cid
+        self._dirty = True
+
+    def unpin(self, cid: Union[CIDv0, CIDv1]) -> bool:
+        self._dirty = True
+        return self._pins.pop(StorageManager._key(cid), None) is not None
+
+    def pin_root(self, root_cid: Union[CIDv0, CIDv1]) -> None:
+        self._pinned_roots[StorageManager._key(root_cid)] = root_cid
+        self._dirty = True
+
+    def unpin_root(self, root_cid: Union[CIDv0, CIDv1]) -> bool:
+        self._dirty = True
+        return self._pinned_roots.pop(StorageManager._key(root_cid), None) is not None
+
+    def hold(self, cid: Union[CIDv0, CIDv1]) -> None:
+        key = StorageManager._key(cid)
+        self._holds[key] = self._holds.get(key, 0) + 1
+
+    def release(self, cid: Union[CIDv0, CIDv1]) -> None:
+        key = StorageManager._key(cid)
+        count = self._holds.get(key, 0) - 1
+        if count > 0:
+            self._holds[key] = count
+        else:
+            self._holds.pop(key, None)
+
+    def is_pinned(self, cid: Union[CIDv0, CIDv1]) -> bool:
+        return self._is_pinned(StorageManager._key(cid))
+
+    async def gc(self, target: Optional[int] = None) -> int:
+        if target is None:
+            if self.quota is None:
+                return 0
+            target = int(self.quota * self._low_water)
+        freed = 0
+        evicted = 0
+        for key, tracked in list(self._blocks.items()):
+            if self.used <= target:
+                break
+            if self._blocks.get(key) is not tracked or self._is_pinned(key):
+                continue
+            cid, size = tracked
+            try:
+                await self._block_storage.delete(cid)
+            except Exception as e:
+                self._logger.warning('Cant delete block, block_cid: %s, e: %s', cid, e)
+                continue
+            if self._blocks.get(key) is not tracked and self._block_storage.has(cid):
+                continue
+            if self._is_pinned(key):
+                self._logger.warning('Block pinned while being evicted, block_cid: %s', cid)
+            self._untrack(key)
+            freed += size
+            evicted += 1
+        if evicted:
+            self._logger.debug('Storage gc, evicted: %d, freed: %d, used: %d', evicted, freed, self.used)
+        if self.quota is not None and self.used > self.quota:
+            self._logger.warning('Storage over quota after gc, used: %d, quota: %d', self.used, self.quota)
+        return freed
+
+    async def _gc_loop(self) -> NoReturn:
+        while True:
+            try:
+                await asyncio.wait_for(self._gc_event.wait(), self._gc_period)
+            except asyncio.exceptions.TimeoutError:
+                pass
+            self._gc_event.clear()
+            if self.quota is not None and self.used > self.quota:
+                await self.gc()
+            if self._dirty:
+                try:
+                    await self.save()
+                except Exception as e:
+                    self._logger.warning('Cant save storage index, path: %s, e: %s', self._index_path, e)
+
+    def _is_pinned(self, key: BlockKey) -> bool:
+        if key in self._pins or key in self._pinned_roots or key in self._holds:
+            return True
+        roots = self._roots.get(key)
+        return roots is not None and any(root_key in self._pinned_roots for root_key in roots)
+
+    def _untrack(self, key: BlockKey) -> None:
+        tracked = self._blocks.pop(key, None)
+        if tracked is not None:
+            self.used -= tracked[1]
+        self._roots.pop(key, None)
+        self._dirty = True
+
+    def _read(self) -> Dict[str, Any]:
+        with open(self._index_path, 'r') as f:
+            return json.load(f)
+
+    def _write(self, index: Dict[str, Any]) -> None:
+        tmp_path = f'{self._index_path}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(index, f, separators=(',', ':'))
+        os.replace(tmp_path, self._index_path)
+
+    @staticmethod
+    def _key(cid: Union[CIDv0, CIDv1]) -> BlockKey:
+        return cid.version, cid.codec, cid.multihash
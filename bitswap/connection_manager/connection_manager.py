@@ -7,6 +7,7 @@ from time import monotonic
 from .base_connection_manager import BaseConnectionManager
 from ..message.message_decoder import MessageDecoder
 from ..message.message_encoder import MessageEncoder
+from ..bandwidth.bandwidth_manager import BandwidthManager
 from ..task.task import Task
 from ..logger import get_stream_logger_colored, get_concurrent_logger
 
@@ -16,18 +17,26 @@ if TYPE_CHECKING:
     from ..session.base_session_manager import BaseSessionManager
     from ..decision.base_engine import BaseEngine
     from ..network.base_network import BaseNetwork
+    from ..message.bitswap_message import BitswapMessage
+    from ..bandwidth.base_bandwidth_manager import BaseBandwidthManager
+    from ..sharding.base_shard_pool import BaseShardPool
 
 
 class ConnectionManager(BaseConnectionManager):
 
     def __init__(self, session_manager: 'BaseSessionManager', engine: 'BaseEngine',
-                 log_level: int = INFO, log_path: Optional[str] = None) -> None:
+                 log_level: int = INFO, log_path: Optional[str] = None, throttle_period: float = 0.05,
+                 bandwidth_manager: Optional['BaseBandwidthManager'] = None,
+                 shard_pool: Optional['BaseShardPool'] = None) -> None:
         if log_path is None:
             self._logger = get_stream_logger_colored(__name__, log_level)
         else:
             self._logger = get_concurrent_logger(__name__, log_path, log_level)
         self._session_manager = session_manager
         self._engine = engine
+        self._throttle_period = throttle_period
+        self._bandwidth_manager = bandwidth_manager
+        self._shard_pool = shard_pool
         self._new_connections_task: Optional[asyncio.Task] = None
 
     def run_handle_conn(self, network: 'BaseNetwork', peer_manager: 'BasePeerManager') -> None:
@@ -53,33 +62,41 @@ class ConnectionManager(BaseConnectionManager):
         logger.debug('Start handle new connections')
         async for peer_cid, network_peer in network.new_connections():
             if logger is not None:
-                logger.debug(f'New connection request, peer_cid: {peer_cid}')
+                logger.debug('New connection request, peer_cid: %s', peer_cid)
             await peer_manager.connect(peer_cid, network_peer)
 
     async def _in_message_handler(self, peer: 'Peer', peer_manager: 'BasePeerManager') -> NoReturn:
         async for message in peer:
             try:
+                if self._shard_pool is not None:
+                    peer.last_active = monotonic()
+                    await self._shard_pool.dispatch(peer, message)
+                    continue
                 bit_msg = MessageDecoder.deserialize(message)
                 peer.last_active = monotonic()
+                await self._engine.wait_ready()
                 self._engine.handle_bit_swap_message(peer, bit_msg, peer_manager)
             except asyncio.exceptions.CancelledError:
                 raise
             except Exception as e:
-                self._logger.exception(f'Handle message exception, peer_cid: {peer.cid}, e: {e}')
+                self._logger.exception('Handle message exception, peer_cid: %s, e: %s', peer.cid, e)
+            while peer.tasks_queue.full():
+                await asyncio.sleep(self._throttle_period)
 
     def _in_message_handler_done(self, task: asyncio.Task, peer: 'Peer', peer_manager: 'BasePeerManager',
                                  out_task_handler: asyncio.Task) -> None:
         try:
             task.result()
         except asyncio.CancelledError:
-            self._logger.debug(f'Cancel _in_message_handler, peer_cid: {peer.cid}')
+            self._logger.debug('Cancel _in_message_handler, peer_cid: %s', peer.cid)
         except Exception as e:
-            self._logger.debug(f'Exception _in_message_handler_done, peer_cid: {peer.cid}, e: {e}')
+            self._logger.debug('Exception _in_message_handler_done, peer_cid: %s, e: %s', peer.cid, e)
         finally:
-            self._logger.debug(f'Close connection, peer_cid: {peer.cid}')
+            self._logger.debug('Close connection, peer_cid: %s', peer.cid)
             out_task_handler.cancel()
-            for session in self._session_manager:
-                session.remove_peer(peer.cid)
+            if self._bandwidth_manager is not None:
+                self._bandwidth_manager.remove_peer(peer.cid)
+            self._session_manager.remove_peer(peer.cid)
             Task.create_task(peer_manager.remove_peer(peer.cid), partial(Task.base_callback, logger=self._logger))
 
     async def _out_message_handler(self, peer: 'Peer') -> NoReturn:
@@ -87,17 +104,28 @@ class ConnectionManager(BaseConnectionManager):
         while True:
             bit_message = await queue.get()
             try:
-                message = MessageEncoder.serialize_1_1_0(bit_message)
+                message = MessageEncoder.serialize(bit_message)
+                if self._bandwidth_manager is not None:
+                    await self._bandwidth_manager.throttle(peer.cid, len(message),
+                                                           ConnectionManager._priority_class(bit_message))
                 await peer.send(message)
             except asyncio.exceptions.CancelledError:
                 raise
             except Exception as e:
-                self._logger.exception(f'Send message exception, peer_cid: {peer.cid}, e: {e}')
+                self._logger.exception('Send message exception, peer_cid: %s, e: %s', peer.cid, e)
+
+    @staticmethod
+    def _priority_class(bit_message: 'BitswapMessage') -> str:
+        if bit_message.payload:
+            return BandwidthManager.BLOCK
+        if bit_message.want_list:
+            return BandwidthManager.WANT
+        return BandwidthManager.PRESENCE
 
     def _out_message_handler_done(self, task: asyncio.Task, peer: 'Peer') -> None:
         try:
             task.result()
         except asyncio.CancelledError:
-            self._logger.debug(f'Cancel _out_message_handler, peer_cid: {peer.cid}')
+            self._logger.debug('Cancel _out_message_handler, peer_cid: %s', peer.cid)
         except Exception as e:
-            self._logger.debug(f'Exception _out_message_handler_done, peer_cid: {peer.cid}, e: {e}')
+            self._logger.debug('Exception _out_message_handler_done, peer_cid: %s, e: %s', peer.cid, e)
@@ -1,4 +1,4 @@
-from typing import Union, Iterable, TYPE_CHECKING
+from typing import Union, Iterable, List, TYPE_CHECKING
 
 from cid import CIDv0, CIDv1
 
@@ -16,9 +16,20 @@ class Sender:
     @staticmethod
     async def _send(b_message: BitswapMessage, peers: Iterable['Peer']) -> None:
         for peer in peers:
-            await peer.response_queue.put(b_message)
-            for cid in b_message.payload.keys():
-                peer.ledger.cancel_want(cid)
+            if await peer.response_queue.put(b_message):
+                for cid in b_message.payload.keys():
+                    peer.ledger.cancel_want(cid)
+
+    @staticmethod
+    def _try_send(b_message: BitswapMessage, peers: Iterable['Peer']) -> List['Peer']:
+        refused = []
+        for peer in peers:
+            if peer.response_queue.try_put(b_message):
+                for cid in b_message.payload.keys():
+                    peer.ledger.cancel_want(cid)
+            else:
+                refused.append(peer)
+        return refused
 
     @staticmethod
     async def send_entries(entries: Iterable['Entry'], peers: Iterable['Peer'],
@@ -47,3 +58,10 @@ class Sender:
         for block in blocks:
             blocks_message.add_block(block)
         await Sender._send(blocks_message, peers)
+
+    @staticmethod
+    def try_send_blocks(peers: Iterable['Peer'], blocks: Iterable['Block']) -> List['Peer']:
+        blocks_message = BitswapMessage(False)
+        for block in blocks:
+            blocks_message.add_block(block)
+        return Sender._try_send(blocks_message, peers)
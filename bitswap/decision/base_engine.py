@@ -9,6 +9,10 @@ if TYPE_CHECKING:
 
 class BaseEngine(metaclass=ABCMeta):
 
+    @abstractmethod
+    async def wait_ready(self) -> None:
+        pass
+
     @abstractmethod
     def handle_bit_swap_message(self, peer: 'Peer', bit_swap_message: 'BitswapMessage',
                                 peer_manager: 'BasePeerManager') -> None:
@@ -11,19 +11,23 @@ from ..connection_manager.sender import Sender
 from ..data_structure.block import Block
 from .base_decision import BaseDecision
 from ..logger import get_stream_logger_colored, get_concurrent_logger
-from ..queue_manager.queue_manager import QueueManager
+from ..message.bitswap_message import BitswapMessage
+from ..strategy.deficit_round_robin_strategy import DeficitRoundRobinStrategy
 
 if TYPE_CHECKING:
     from ..message.message_entry import MessageEntry
     from ..block_storage.base_block_storage import BaseBlockStorage
     from ..peer.base_peer_manager import BasePeerManager
+    from ..peer.peer import Peer
+    from ..strategy.base_strategy import BaseStrategy
 
 
 class Decision(BaseDecision):
 
     def __init__(self, block_storage: 'BaseBlockStorage', peer_manager: 'BasePeerManager',
                  max_block_size_have_to_block: int = 1024, task_wait_timeout: float = 0.5,
-                 sleep_timeout: float = 0.1, log_level: int = INFO, log_path: Optional[str] = None) -> None:
+                 sleep_timeout: float = 0.1, log_level: int = INFO, log_path: Optional[str] = None,
+                 strategy: Optional['BaseStrategy'] = None) -> None:
         if log_path is None:
             self._logger = get_stream_logger_colored(__name__, log_level)
         else:
@@ -33,6 +37,7 @@ class Decision(BaseDecision):
         self._max_block_size_have_to_block = max_block_size_have_to_block
         self._task_wait_timeout = task_wait_timeout
         self._sleep_timeout = sleep_timeout
+        self._strategy = strategy if strategy is not None else DeficitRoundRobinStrategy()
         self._decision_task: Optional[asyncio.Task] = None
 
     def run(self) -> None:
@@ -50,78 +55,84 @@ class Decision(BaseDecision):
     def __exit__(self, exc_type: Any, exc_val: Any, exc_tb: Any) -> None:
         self.stop()
 
-    async def _send_block(self, peer_cid: Union[CIDv0, CIDv1],
-                          block_cid: Union[CIDv0, CIDv1]) -> None:
-        block = Block(block_cid, await self._block_storage.get(block_cid))
-        peer = self._peer_manager.get_peer(peer_cid)
+    async def _send_block(self, peer: 'Peer', entry: 'MessageEntry') -> int:
+        block = Block(entry.cid, await self._block_storage.get(entry.cid))
+        if Sender.try_send_blocks((peer,), (block,)):
+            self._defer_task(peer, entry)
+            return 0
         peer.bytes_send += len(block)
-        await Sender.send_blocks((peer,), (block,))
-        self._logger.debug(f'Sent block, peer_cid: {peer_cid}, block_cid: {block_cid}')
+        self._logger.debug('Sent block, peer_cid: %s, block_cid: %s', peer.cid, entry.cid)
+        return len(block)
+
+    def _defer_task(self, peer: 'Peer', entry: 'MessageEntry') -> None:
+        try:
+            peer.tasks_queue.put_nowait(entry)
+        except asyncio.QueueFull:
+            self._logger.debug('Tasks queue full, drop deferred block, peer_cid: %s, block_cid: %s',
+                               peer.cid, entry.cid)
+        else:
+            self._logger.debug('Response queue full, defer block, peer_cid: %s, block_cid: %s', peer.cid, entry.cid)
 
     async def _send_have(self, peer_cid: Union[CIDv0, CIDv1],
-                         block_cid: Union[CIDv0, CIDv1]) -> None:
+                         block_cid: Union[CIDv0, CIDv1]) -> int:
         await Sender.send_presence(block_cid, (self._peer_manager.get_peer(peer_cid),),
                                    ProtoBuff.BlockPresenceType.Have)
-        self._logger.debug(f'Sent have, peer_cid: {peer_cid}, block_cid: {block_cid}')
+        self._logger.debug('Sent have, peer_cid: %s, block_cid: %s', peer_cid, block_cid)
+        return BitswapMessage.entry_size
 
     async def _send_do_not_have(self, peer_cid: Union[CIDv0, CIDv1],
-                                block_cid: Union[CIDv0, CIDv1]) -> None:
+                                block_cid: Union[CIDv0, CIDv1]) -> int:
         await Sender.send_presence(block_cid, (self._peer_manager.get_peer(peer_cid),),
                                    ProtoBuff.BlockPresenceType.DontHave)
-        self._logger.debug(f'Sent do not have, peer_cid: {peer_cid}, block_cid: {block_cid}')
+        self._logger.debug('Sent do not have, peer_cid: %s, block_cid: %s', peer_cid, block_cid)
+        return BitswapMessage.entry_size
 
-    async def _send_block_or_do_not_have(self, peer_cid: Union[CIDv0, CIDv1],
-                                         block_cid: Union[CIDv0, CIDv1]) -> None:
-        if self._block_storage.has(block_cid):
-            await self._send_block(peer_cid, block_cid)
+    async def _send_block_or_do_not_have(self, peer: 'Peer', entry: 'MessageEntry') -> int:
+        if self._block_storage.has(entry.cid):
+            return await self._send_block(peer, entry)
         else:
-            await self._send_do_not_have(peer_cid, block_cid)
+            return await self._send_do_not_have(peer.cid, entry.cid)
 
     async def _decision(self) -> NoReturn:
         while True:
             try:
-                peers_sm_q = QueueManager.get_peers_smallest_response_queue(self._peer_manager.get_all_peers())
-                if peers_sm_q is None:
+                peers = [p for p in self._peer_manager.get_all_peers()
+                         if p.tasks_queue.qsize() > 0 and not p.response_queue.full()]
+                peer = self._strategy.select_peer(peers)
+                if peer is None:
                     await asyncio.sleep(self._sleep_timeout)
                 else:
-                    peer_not_empty_tasks_queue = []
-                    for peer_s_q in peers_sm_q:
-                        if peer_s_q.tasks_queue.qsize() > 0:
-                            peer_not_empty_tasks_queue.append(peer_s_q)
-                    if not peer_not_empty_tasks_queue:
-                        await asyncio.sleep(self._sleep_timeout)
-                    else:
-                        peer_high_rank = max(peer_not_empty_tasks_queue, key=lambda p: p.peer_rank)
-                        peer_cid = peer_high_rank.cid
-                        ledger = peer_high_rank.ledger
-                        tasks_queue = peer_high_rank.tasks_queue
-                        entry: 'MessageEntry' = await asyncio.wait_for(tasks_queue.get(), self._task_wait_timeout)
-                        while entry.cid not in ledger:
-                            _, entry = await asyncio.wait_for(tasks_queue.get(), self._task_wait_timeout)
-                        if entry.want_type == ProtoBuff.WantType.Have:
-                            wants = ledger.get_entry(entry.cid)
-                            if wants.want_type == ProtoBuff.WantType.Block:
-                                await self._send_block_or_do_not_have(peer_cid, entry.cid)
-                            elif wants.want_type == ProtoBuff.WantType.Have:
-                                if self._block_storage.has(entry.cid):
-                                    if await self._block_storage.size(entry.cid) <= \
-                                            self._max_block_size_have_to_block:
-                                        await self._send_block(peer_cid, entry.cid)
-                                    else:
-                                        await self._send_have(peer_cid, entry.cid)
-                                elif entry.send_do_not_have:
-                                    await self._send_do_not_have(peer_cid, entry.cid)
-                            else:
-                                self._logger.warning(f'Bad wants want type, want_type: {wants.want_type}, '
-                                                     f'cid: {entry.cid}')
-                        elif entry.want_type == ProtoBuff.WantType.Block:
-                            await self._send_block_or_do_not_have(peer_cid, entry.cid)
-                        else:
-                            self._logger.warning(f'Bad task entry want type, want_type: {entry.want_type}, '
-                                                 f'cid: {entry.cid}')
+                    self._strategy.served(peer, await self._handle_task(peer))
             except asyncio.exceptions.TimeoutError:
                 pass
             except asyncio.exceptions.CancelledError:
                 raise
             except Exception as e:
-                self._logger.exception(f'Decision work exception, e: {e}')
+                self._logger.exception('Decision work exception, e: %s', e)
+
+    async def _handle_task(self, peer: 'Peer') -> int:
+        peer_cid = peer.cid
+        ledger = peer.ledger
+        tasks_queue = peer.tasks_queue
+        entry: 'MessageEntry' = await asyncio.wait_for(tasks_queue.get(), self._task_wait_timeout)
+        while entry.cid not in ledger:
+            entry = await asyncio.wait_for(tasks_queue.get(), self._task_wait_timeout)
+        if entry.want_type == ProtoBuff.WantType.Have:
+            wants = ledger.get_entry(entry.cid)
+            if wants.want_type == ProtoBuff.WantType.Block:
+                return await self._send_block_or_do_not_have(peer, entry)
+            elif wants.want_type == ProtoBuff.WantType.Have:
+                if self._block_storage.has(entry.cid):
+                    if await self._block_storage.size(entry.cid) <= self._max_block_size_have_to_block:
+                        return await self._send_block(peer, entry)
+                    else:
+                        return await self._send_have(peer_cid, entry.cid)
+                elif entry.send_do_not_have:
+                    return await self._send_do_not_have(peer_cid, entry.cid)
+            else:
+                self._logger.warning('Bad wants want type, want_type: %s, cid: %s', wants.want_type, entry.cid)
+        elif entry.want_type == ProtoBuff.WantType.Block:
+            return await self._send_block_or_do_not_have(peer, entry)
+        else:
+            self._logger.warning('Bad task entry want type, want_type: %s, cid: %s', entry.want_type, entry.cid)
+        return 0
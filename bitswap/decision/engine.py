@@ -1,11 +1,10 @@
 from typing import Dict, Union, Iterable, TYPE_CHECKING, Optional
-from logging import INFO
-from functools import partial
+from logging import INFO, DEBUG
 
 from cid import CIDv0, CIDv1
 
 from .ledger import Ledger
-from ..task.task import Task
+from ..task.task_supervisor import TaskSupervisor
 from ..connection_manager.sender import Sender
 from ..message.proto_buff import ProtoBuff
 from .base_engine import BaseEngine
@@ -17,12 +16,20 @@ if TYPE_CHECKING:
     from ..peer.peer import Peer
     from ..message.message_entry import MessageEntry
     from ..message.bitswap_message import BitswapMessage
+    from ..provider.base_provider_cache import BaseProviderCache
+    from ..task.base_task_supervisor import BaseTaskSupervisor
+    from ..presence.base_presence_index import BasePresenceIndex
+    from ..block_storage.base_block_writer import BaseBlockWriter
 
 
 class Engine(BaseEngine):
 
     def __init__(self, local_ledger: Ledger, term_score: float = 10, alpha_score: float = 0.5,
-                 log_level: int = INFO, log_path: Optional[str] = None) -> None:
+                 log_level: int = INFO, log_path: Optional[str] = None,
+                 provider_cache: Optional['BaseProviderCache'] = None,
+                 task_supervisor: Optional['BaseTaskSupervisor'] = None,
+                 presence_index: Optional['BasePresenceIndex'] = None,
+                 block_writer: Optional['BaseBlockWriter'] = None) -> None:
         if log_path is None:
             self._logger = get_stream_logger_colored(__name__, log_level)
         else:
@@ -30,6 +37,16 @@ class Engine(BaseEngine):
         self.local_ledger = local_ledger
         self._term_score = term_score
         self._alpha_score = alpha_score
+        self._provider_cache = provider_cache
+        if task_supervisor is None:
+            task_supervisor = TaskSupervisor(log_level=log_level, log_path=log_path)
+        self._task_supervisor = task_supervisor
+        self._presence_index = presence_index
+        self._block_writer = block_writer
+
+    async def wait_ready(self) -> None:
+        await self._task_supervisor.wait_capacity(TaskSupervisor.ENTRIES)
+        await self._task_supervisor.wait_capacity(TaskSupervisor.CANCEL)
 
     def handle_bit_swap_message(self, peer: 'Peer', bit_swap_message:  'BitswapMessage',
                                 peer_manager: 'BasePeerManager') -> None:
@@ -39,49 +56,71 @@ class Engine(BaseEngine):
 
     def _handle_payload(self, peer: 'Peer', payload: Dict[Union[CIDv0, CIDv1], 'Block'],
                         peer_manager: 'BasePeerManager') -> None:
-        all_peers = peer_manager.get_all_peers()
         for cid, block in payload.items():
+            if self._presence_index is not None:
+                self._presence_index.add_have(cid, peer.cid)
             entry = self.local_ledger.get_entry(cid)
             if entry is not None:
                 cancel_peers = []
                 for session in entry.sessions:
                     session.add_peer(peer, cid, have=False)
-                    if entry.block is None:
+                    if not entry.has_block:
                         session.change_peer_score(peer.cid, self._term_score, self._alpha_score)
                         cancel_peers.extend(session.get_notify_peers(cid, peer.cid))
-                if entry.block is None:
+                if not entry.has_block:
                     entry.block = block.data
+                    if self._block_writer is not None:
+                        self._block_writer.submit(cid, block.data, entry.release_block)
                     peer.bytes_receive += len(block)
-                    self._logger.debug(f'Got block from {peer.cid}, block_cid: {cid}')
+                    if self._provider_cache is not None:
+                        self._provider_cache.add_provider(cid, peer.cid)
+                        self._provider_cache.report_success(cid, peer.cid)
+                    self._logger.debug('Got block from %s, block_cid: %s', peer.cid, cid)
                     if cancel_peers:
-                        Task.create_task(Sender.send_cancel(cid, cancel_peers),
-                                         partial(Task.base_callback, logger=self._logger))
-                        self._logger.debug(f'Send cancel to {[str(p.cid) for p in all_peers]}, block_cid: {cid}')
-            wants_peers = list(filter(lambda p: cid in p.ledger, all_peers))
+                        self._task_supervisor.spawn(TaskSupervisor.CANCEL, Sender.send_cancel(cid, cancel_peers))
+                        if self._logger.isEnabledFor(DEBUG):
+                            self._logger.debug('Send cancel to %s, block_cid: %s',
+                                               [str(p.cid) for p in cancel_peers], cid)
+            wants_peers = peer_manager.get_wanting_peers(cid)
             if wants_peers:
-                Task.create_task(Sender.send_blocks(wants_peers, (block,)),
-                                 partial(Task.base_callback, logger=self._logger))
-                self._logger.debug(f'Send block to {[str(p.cid) for p in wants_peers]}, block_cid: {cid}')
+                refused = Sender.try_send_blocks(wants_peers, (block,))
+                if self._logger.isEnabledFor(DEBUG):
+                    self._logger.debug('Send block to %s, block_cid: %s',
+                                       [str(p.cid) for p in wants_peers if p not in refused], cid)
+                    if refused:
+                        self._logger.debug('Response queue full, drop relayed block, peers: %s, block_cid: %s',
+                                           [str(p.cid) for p in refused], cid)
 
     def _handle_presences(self, peer: 'Peer',
                           block_presences: Dict[Union[CIDv0, CIDv1], 'ProtoBuff.BlockPresenceType']) -> None:
         for cid, b_presence_type in block_presences.items():
+            if self._presence_index is not None:
+                if b_presence_type == ProtoBuff.BlockPresenceType.Have:
+                    self._presence_index.add_have(cid, peer.cid)
+                elif b_presence_type == ProtoBuff.BlockPresenceType.DontHave:
+                    self._presence_index.add_do_not_have(cid, peer.cid)
             entry = self.local_ledger.get_entry(cid)
             if entry is not None:
                 if b_presence_type == ProtoBuff.BlockPresenceType.Have:
+                    if self._provider_cache is not None:
+                        self._provider_cache.add_provider(cid, peer.cid)
                     for session in entry.sessions:
                         session.add_peer(peer, cid)
                 elif b_presence_type == ProtoBuff.BlockPresenceType.DontHave:
+                    if self._provider_cache is not None:
+                        self._provider_cache.report_failure(cid, peer.cid)
                     for session in entry.sessions:
                         session.change_peer_score(peer.cid, 0, self._alpha_score)
                         session.remove_peer_from_have(entry.cid, peer)
 
     def _handle_entries(self, peer: 'Peer', entries: Dict[Union[CIDv0, CIDv1], 'MessageEntry']) -> None:
-        Task.create_task(self._add_entries_q_ledger(peer, entries.values()),
-                         partial(Task.base_callback, logger=self._logger))
+        self._task_supervisor.spawn(TaskSupervisor.ENTRIES, self._add_entries_q_ledger(peer, entries.values()))
 
     @staticmethod
     async def _add_entries_q_ledger(peer: 'Peer', entries: Iterable['MessageEntry']) -> None:
         for entry in entries:
+            if entry.cancel:
+                peer.ledger.cancel_want(entry.cid)
+                continue
             peer.ledger.wants(entry.cid, entry.priority, entry.want_type)
             await peer.tasks_queue.put(entry)
@@ -3,30 +3,50 @@ from typing import Union, Optional, Iterator, TYPE_CHECKING
 from cid import CIDv0, CIDv1
 
 if TYPE_CHECKING:
-    from ..wantlist.wantlist import WantList
-    from ..wantlist.entry import Entry
+    from ..wantlist.wantlist import WantList, AnyEntry
+    from ..wantlist.base_want_index import BaseWantIndex
     from ..message.proto_buff import ProtoBuff
+    from ..peer.peer import Peer
 
 
 class Ledger:
 
     def __init__(self, want_list: 'WantList') -> None:
         self._want_list = want_list
+        self._want_index: Optional['BaseWantIndex'] = None
+        self._owner: Optional['Peer'] = None
 
-    def __iter__(self) -> Iterator['Entry']:
+    def __iter__(self) -> Iterator['AnyEntry']:
         return self._want_list.__iter__()
 
     def __contains__(self, cid: Union[CIDv0, CIDv1]) -> bool:
         return cid in self._want_list
 
+    def __len__(self) -> int:
+        return len(self._want_list)
+
+    def bind(self, want_index: 'BaseWantIndex', owner: 'Peer') -> None:
+        self._want_index = want_index
+        self._owner = owner
+        for entry in self._want_list:
+            want_index.add(entry.cid, owner)
+
     def wants(self, cid: Union[CIDv0, CIDv1], priority: int,
               want_type: 'ProtoBuff.WantType') -> None:
-        self._want_list.add(cid, priority, want_type)
+        if self._want_list.add(cid, priority, want_type) and self._want_index is not None:
+            self._want_index.add(cid, self._owner)
 
     def cancel_want(self, cid: Union[CIDv0, CIDv1]) -> bool:
-        return self._want_list.remove(cid)
+        removed = self._want_list.remove(cid)
+        if removed and self._want_index is not None:
+            self._want_index.remove(cid, self._owner)
+        return removed
+
+    def clear(self) -> None:
+        for entry in self._want_list.entries():
+            self.cancel_want(entry.cid)
 
-    def get_entry(self, cid: Union[CIDv0, CIDv1]) -> Optional['Entry']:
+    def get_entry(self, cid: Union[CIDv0, CIDv1]) -> Optional['AnyEntry']:
         try:
             entry = self._want_list[cid]
         except KeyError:
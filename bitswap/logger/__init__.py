@@ -1 +1,2 @@
-from .logger import get_stream_logger, get_stream_logger_colored, get_concurrent_logger
+from .logger import get_stream_logger, get_stream_logger_colored, get_concurrent_logger, set_log_sample_rate, \
+    stop_log_listeners, SamplingFilter
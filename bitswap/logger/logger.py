@@ -1,15 +1,68 @@
-from logging import getLogger, Logger, Formatter, Handler, StreamHandler
-from typing import Optional
+from logging import getLogger, Logger, Formatter, Handler, StreamHandler, Filter, LogRecord, DEBUG
+from typing import Optional, Callable, Dict, Tuple, Any
+from queue import SimpleQueue
+import atexit
 import os
 
-import colorlog
-from concurrent_log_handler import ConcurrentRotatingFileHandler
 
+class SamplingFilter(Filter):
 
-def _get_logger(logger_name: str, handler: Handler, log_level: int, formatter: Formatter) -> Logger:
+    def __init__(self, rate: int = 1, max_level: int = DEBUG, max_templates: int = 4096) -> None:
+        super().__init__()
+        self.rate = rate
+        self._max_level = max_level
+        self._max_templates = max_templates
+        self._counts: Dict[Tuple[str, str], int] = {}
+
+    def filter(self, record: LogRecord) -> bool:
+        if self.rate <= 1 or record.levelno > self._max_level:
+            return True
+        key = (record.name, str(record.msg))
+        count = self._counts.get(key, 0)
+        if count == 0 and len(self._counts) >= self._max_templates:
+            self._counts.clear()
+        self._counts[key] = count + 1
+        return count % self.rate == 0
+
+
+_sampling_filter = SamplingFilter()
+_queues: Dict[str, SimpleQueue] = {}
+_listeners: Dict[str, Any] = {}
+
+
+def set_log_sample_rate(rate: int) -> None:
+    _sampling_filter.rate = rate
+
+
+def stop_log_listeners() -> None:
+    while _listeners:
+        key, listener = _listeners.popitem()
+        listener.stop()
+        del _queues[key]
+
+
+atexit.register(stop_log_listeners)
+
+
+def _get_queue(queue_key: str, handler_factory: Callable[[], Handler], formatter: Formatter) -> SimpleQueue:
+    queue = _queues.get(queue_key)
+    if queue is None:
+        from logging.handlers import QueueListener
+        handler = handler_factory()
+        handler.setFormatter(formatter)
+        queue = _queues[queue_key] = SimpleQueue()
+        listener = _listeners[queue_key] = QueueListener(queue, handler)
+        listener.start()
+    return queue
+
+
+def _get_logger(logger_name: str, queue_key: str, handler_factory: Callable[[], Handler], log_level: int,
+                formatter: Formatter) -> Logger:
     logger = getLogger(logger_name)
     if not logger.hasHandlers():
-        handler.setFormatter(formatter)
+        from logging.handlers import QueueHandler
+        handler = QueueHandler(_get_queue(queue_key, handler_factory, formatter))
+        handler.addFilter(_sampling_filter)
         logger.addHandler(handler)
         logger.setLevel(log_level)
     return logger
@@ -20,13 +73,17 @@ def get_concurrent_logger(logger_name: str, log_path: str, log_level: int,
                           max_bytes=512 * 1024, backup_count=5) -> Logger:
     if not os.path.exists(log_path):
         raise FileNotFoundError(f'log_path: {log_path}')
-    return _get_logger(logger_name, ConcurrentRotatingFileHandler(log_path, 'a', max_bytes, backup_count),
-                       log_level, Formatter(log_format))
+
+    def handler_factory() -> Handler:
+        from concurrent_log_handler import ConcurrentRotatingFileHandler
+        return ConcurrentRotatingFileHandler(log_path, 'a', max_bytes, backup_count)
+
+    return _get_logger(logger_name, f'file:{log_path}', handler_factory, log_level, Formatter(log_format))
 
 
 def get_stream_logger(logger_name: str, log_level: int,
                       log_format: str = '%(asctime)s %(levelname)s %(name)s %(message)s') -> Logger:
-    return _get_logger(logger_name, StreamHandler(), log_level, Formatter(log_format))
+    return _get_logger(logger_name, 'stream', StreamHandler, log_level, Formatter(log_format))
 
 
 def get_stream_logger_colored(logger_name: str, log_level: int,
@@ -40,5 +97,6 @@ def get_stream_logger_colored(logger_name: str, log_level: int,
             'ERROR': 'red',
             'CRITICAL': 'red,bg_white',
         }
+    import colorlog
     formatter = colorlog.ColoredFormatter(log_format, log_colors=log_colors, style='%')
-    return _get_logger(logger_name, colorlog.StreamHandler(), log_level, formatter)
+    return _get_logger(logger_name, 'colored', colorlog.StreamHandler, log_level, formatter)
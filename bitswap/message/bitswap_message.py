@@ -1,4 +1,4 @@
-from typing import Union, Dict, TYPE_CHECKING
+from typing import Union, Dict, Optional, TYPE_CHECKING
 
 from cid import CIDv0, CIDv1
 
@@ -11,14 +11,29 @@ if TYPE_CHECKING:
 
 class BitswapMessage:
 
+    entry_size = 64
+
     def __init__(self, full: bool) -> None:
         self.full = full
         self.want_list: Dict[Union[CIDv0, CIDv1], MessageEntry] = {}
         self.payload: Dict[Union[CIDv0, CIDv1], 'Block'] = {}
         self.block_presences: Dict[Union[CIDv0, CIDv1], 'ProtoBuff.BlockPresenceType'] = {}
+        self._encoded: Dict[str, bytes] = {}
+
+    @property
+    def size(self) -> int:
+        return sum(len(block) for block in self.payload.values()) + \
+            self.entry_size * (len(self.want_list) + len(self.block_presences))
+
+    def get_encoded(self, version: str) -> Optional[bytes]:
+        return self._encoded.get(version)
+
+    def set_encoded(self, version: str, message: bytes) -> None:
+        self._encoded[version] = message
 
     def add_entry(self, cid: Union[CIDv0, CIDv1], priority: int, cancel: bool,
                   want_type: 'ProtoBuff.WantType', send_do_not_have: bool) -> None:
+        self._encoded.clear()
         entry = self.want_list.get(cid)
         if entry is not None and (entry.want_type == ProtoBuff.WantType.Block or
                                   want_type == ProtoBuff.WantType.Have):
@@ -32,7 +47,9 @@ class BitswapMessage:
             self.want_list[cid] = MessageEntry(cid, priority, cancel, want_type, send_do_not_have)
 
     def add_block(self, block: 'Block') -> None:
+        self._encoded.clear()
         self.payload[block.cid] = block
 
     def add_block_presence(self, cid: Union[CIDv0, CIDv1], presence_type: 'ProtoBuff.BlockPresenceType') -> None:
+        self._encoded.clear()
         self.block_presences[cid] = presence_type
@@ -1,27 +1,13 @@
-from typing import List
-from io import BytesIO
-
-from cid import make_cid
 import multihash
-from multicodec.constants import CODE_TABLE
-from varint import decode_stream
 
 from .proto_buff import ProtoBuff
 from .bitswap_message import BitswapMessage
 from ..data_structure.block import Block
-from ..table import HASH_TABLE
+from ..table import HASH_TABLE, CID_CACHE, PREFIX_TABLE
 
 
 class MessageDecoder:
 
-    @staticmethod
-    def _decode_var_int(buffer: bytes) -> List[int]:
-        bytes_stream = BytesIO(buffer)
-        res = []
-        while bytes_stream.tell() < len(buffer):
-            res.append(decode_stream(bytes_stream))
-        return res
-
     @staticmethod
     def deserialize(raw_message: bytes) -> BitswapMessage:
         decoded_message = ProtoBuff.Message()
@@ -30,19 +16,18 @@ class MessageDecoder:
         bitswap_message = BitswapMessage(full)
         if decoded_message.wantlist:
             for entry in decoded_message.wantlist.entries:
-                cid = make_cid(entry.block)
+                cid = CID_CACHE.decode(entry.block)
                 bitswap_message.add_entry(cid, entry.priority, entry.cancel, entry.wantType, entry.sendDontHave)
         if decoded_message.blocks:
-            hash_func = HASH_TABLE[multihash.coerce_code('sha2-256')]
+            hash_code = multihash.coerce_code('sha2-256')
+            hash_func = HASH_TABLE[hash_code]
             for block in decoded_message.blocks:
-                mh = multihash.encode(hash_func(block).digest(), 'sha2-256')
-                bitswap_message.add_block(Block(make_cid(multihash.to_b58_string(mh)), block))
+                mh = multihash.encode(hash_func(block).digest(), hash_code)
+                bitswap_message.add_block(Block(CID_CACHE.from_parts(0, 'dag-pb', mh), block))
         for payload in decoded_message.payload:
-            cid_version, multi_codec, hash_func_prefix, _ = MessageDecoder._decode_var_int(payload.prefix)
-            hash_func = HASH_TABLE[multihash.coerce_code(hash_func_prefix)]
-            multi_hash = multihash.encode(hash_func(payload.data).digest(), hash_func_prefix)
-            cid = make_cid(cid_version, CODE_TABLE[multi_codec], multi_hash)
-            bitswap_message.add_block(Block(cid, payload.data))
+            cid_version, codec, hash_code, hash_func = PREFIX_TABLE.decode(payload.prefix)
+            multi_hash = multihash.encode(hash_func(payload.data).digest(), hash_code)
+            bitswap_message.add_block(Block(CID_CACHE.from_parts(cid_version, codec, multi_hash), payload.data))
         for block_presence in decoded_message.blockPresences:
-            bitswap_message.add_block_presence(make_cid(block_presence.cid), block_presence.type)
+            bitswap_message.add_block_presence(CID_CACHE.decode(block_presence.cid), block_presence.type)
         return bitswap_message
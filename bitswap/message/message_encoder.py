@@ -1,11 +1,9 @@
 from typing import Union, TYPE_CHECKING
 
 from cid import CIDv0, CIDv1
-from multicodec import get_prefix
-from varint import encode
-import multihash
 
 from .proto_buff import ProtoBuff
+from ..table import CID_CACHE, PREFIX_TABLE
 
 if TYPE_CHECKING:
     from .bitswap_message import BitswapMessage
@@ -13,12 +11,12 @@ if TYPE_CHECKING:
 
 class MessageEncoder:
 
+    VERSION_1_0_0 = '1.0.0'
+    VERSION_1_1_0 = '1.1.0'
+
     @staticmethod
-    def _cid_prefix(cid: Union[CIDv0, CIDv1]):
-        version_bytes = encode(cid.version)
-        codec_bytes = get_prefix(cid.codec)
-        hash_alg_and_len_bytes = multihash.get_prefix(cid.multihash)
-        return version_bytes + codec_bytes + hash_alg_and_len_bytes
+    def _cid_prefix(cid: Union[CIDv0, CIDv1]) -> bytes:
+        return PREFIX_TABLE.encode(cid)
 
     @staticmethod
     def _serialize_entries(bitswap_message: 'BitswapMessage') -> 'ProtoBuff.Message':
@@ -33,7 +31,7 @@ class MessageEncoder:
                 msg_entry.wantType, msg_entry.sendDontHave = entry.dump_fields()
         for cid, presence_type in bitswap_message.block_presences.items():
             msg_presence = block_presences.add()
-            msg_presence.cid = cid.encode()
+            msg_presence.cid = CID_CACHE.encode(cid)
             msg_presence.type = presence_type
         return message
 
@@ -55,3 +53,16 @@ class MessageEncoder:
             msg_payload.prefix = MessageEncoder._cid_prefix(block.cid)
             msg_payload.data = block.data
         return message.SerializeToString()
+
+    @staticmethod
+    def serialize(bitswap_message: 'BitswapMessage', version: str = VERSION_1_1_0) -> bytes:
+        message = bitswap_message.get_encoded(version)
+        if message is None:
+            if version == MessageEncoder.VERSION_1_1_0:
+                message = MessageEncoder.serialize_1_1_0(bitswap_message)
+            elif version == MessageEncoder.VERSION_1_0_0:
+                message = MessageEncoder.serialize_1_0_0(bitswap_message)
+            else:
+                raise ValueError(f'Unknown protocol version: {version}')
+            bitswap_message.set_encoded(version, message)
+        return message
@@ -2,42 +2,25 @@ from typing import Union, Tuple, TYPE_CHECKING
 
 from cid import CIDv0, CIDv1
 
-from ..wantlist.entry import Entry
+from ..wantlist.remote_entry import RemoteEntry
+from ..table import CID_CACHE
 
 if TYPE_CHECKING:
     from .proto_buff import ProtoBuff
 
 
-class MessageEntry:
+class MessageEntry(RemoteEntry):
+
+    __slots__ = ('cancel', 'send_do_not_have')
 
     def __init__(self, cid: Union[CIDv0, CIDv1], priority: int, cancel: bool,
                  want_type: 'ProtoBuff.WantType', send_do_not_have: bool) -> None:
-        self.entry = Entry(cid, priority, want_type)
+        super().__init__(cid, priority, want_type)
         self.cancel = cancel
         self.send_do_not_have = send_do_not_have
 
     def __lt__(self, other: 'MessageEntry') -> bool:
-        return self.entry.priority > other.entry.priority
+        return self.priority > other.priority
 
     def dump_fields(self) -> Tuple[bytes, int, bool, 'ProtoBuff.WantType', bool]:
-        return self.entry.cid.encode(), self.priority, self.cancel, self.entry.want_type, self.send_do_not_have
-
-    @property
-    def cid(self) -> Union[CIDv0, CIDv1]:
-        return self.entry.cid
-
-    @property
-    def priority(self) -> int:
-        return self.entry.priority
-
-    @priority.setter
-    def priority(self, priority: int) -> None:
-        self.entry.priority = priority
-
-    @property
-    def want_type(self) -> 'ProtoBuff.WantType':
-        return self.entry.want_type
-
-    @want_type.setter
-    def want_type(self, want_type: 'ProtoBuff.WantType') -> None:
-        self.entry.want_type = want_type
+        return CID_CACHE.encode(self.cid), self.priority, self.cancel, self.want_type, self.send_do_not_have
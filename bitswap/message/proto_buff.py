@@ -1,8 +1,20 @@
-from .pb.message_pb2 import Message
+from typing import Any
 
 
-class ProtoBuff:
-    Message = Message
-    WantList = Message.Wantlist
-    WantType = Message.Wantlist.WantType
-    BlockPresenceType = Message.BlockPresenceType
+class _LazyProtoBuff(type):
+
+    _names = ('Message', 'WantList', 'WantType', 'BlockPresenceType')
+
+    def __getattr__(cls, name: str) -> Any:
+        if name not in cls._names:
+            raise AttributeError(name)
+        from .pb.message_pb2 import Message
+        cls.Message = Message
+        cls.WantList = Message.Wantlist
+        cls.WantType = Message.Wantlist.WantType
+        cls.BlockPresenceType = Message.BlockPresenceType
+        return type.__getattribute__(cls, name)
+
+
+class ProtoBuff(metaclass=_LazyProtoBuff):
+    pass
@@ -7,6 +7,7 @@ from cid import CIDv0, CIDv1
 if TYPE_CHECKING:
     from .peer import Peer
     from ..network.base_network import BasePeer
+    from .peer_stats import PeerStats
 
 
 class BasePeerManager(metaclass=ABCMeta):
@@ -45,6 +46,10 @@ class BasePeerManager(metaclass=ABCMeta):
     def get_peer(self, peer_cid: Union[CIDv0, CIDv1]) -> Optional['Peer']:
         pass
 
+    @abstractmethod
+    def get_wanting_peers(self, block_cid: Union[CIDv0, CIDv1]) -> List['Peer']:
+        pass
+
     @abstractmethod
     async def connect(self, peer_cid: Union[CIDv0, CIDv1], network_peer: Optional['BasePeer'] = None) -> 'Peer':
         pass
@@ -60,3 +65,15 @@ class BasePeerManager(metaclass=ABCMeta):
     @abstractmethod
     async def disconnect_no_active_peers(self) -> NoReturn:
         pass
+
+    @abstractmethod
+    async def trim_peers(self) -> int:
+        pass
+
+    @abstractmethod
+    def get_peers_stats(self) -> Dict[str, 'PeerStats']:
+        pass
+
+    @abstractmethod
+    def set_peers_stats(self, peers_stats: Dict[str, 'PeerStats']) -> None:
+        pass
@@ -1,10 +1,14 @@
-from typing import Union, AsyncGenerator, TYPE_CHECKING
-from asyncio.queues import Queue, PriorityQueue
+from typing import Union, AsyncGenerator, Optional, TYPE_CHECKING
+from asyncio.queues import PriorityQueue
 from time import monotonic
-from math import inf
+from math import inf, sqrt
+import asyncio
 
 from cid import CIDv0, CIDv1
 
+from ..queue_manager.response_queue import ResponseQueue
+from .peer_stats import PeerStats
+
 if TYPE_CHECKING:
     from ..network.base_network import BasePeer
     from ..decision.ledger import Ledger
@@ -13,16 +17,23 @@ if TYPE_CHECKING:
 class Peer:
 
     def __init__(self, peer_cid: Union[CIDv0, CIDv1], network_peer: 'BasePeer', ledger: 'Ledger',
-                 bytes_receive: int = 0, bytes_send: int = 0) -> None:
+                 bytes_receive: int = 0, bytes_send: int = 0, latency_alpha: float = 0.2,
+                 response_queue: Optional[ResponseQueue] = None, max_tasks: int = 0) -> None:
         self.cid = peer_cid
         self.ledger = ledger
         self.bytes_receive = bytes_receive
         self.bytes_send = bytes_send
-        self.response_queue = Queue()
-        self.tasks_queue = PriorityQueue()
+        self.response_queue = response_queue if response_queue is not None else ResponseQueue()
+        self.tasks_queue = PriorityQueue(max_tasks)
         self.last_active = monotonic()
+        self.connected_at = monotonic()
+        self.next_ping = monotonic()
+        self.ping_failures = 0
+        self.score: float = 0
         self._network_peer = network_peer
+        self._latency_alpha = latency_alpha
         self._latency: float = inf
+        self._latency_var: float = 0
 
     def __aiter__(self) -> AsyncGenerator[bytes, None]:
         return self._network_peer.__aiter__()
@@ -33,16 +44,53 @@ class Peer:
             return 0
         return self.bytes_receive / (self.bytes_send + self.bytes_receive)
 
+    @property
+    def debt_ratio(self) -> float:
+        return self.bytes_send / (self.bytes_receive + 1)
+
     async def send(self, message: bytes) -> None:
         await self._network_peer.send(message)
 
     async def close(self) -> None:
         await self._network_peer.close()
 
-    async def ping(self) -> None:
-        latency = await self._network_peer.ping()
-        self._latency = latency if latency is not None else inf
+    async def ping(self, timeout: Optional[float] = None) -> Optional[float]:
+        try:
+            latency = await asyncio.wait_for(self._network_peer.ping(), timeout)
+        except asyncio.exceptions.TimeoutError:
+            latency = None
+        if latency is None:
+            self.ping_failures += 1
+        else:
+            self.ping_failures = 0
+            self._add_latency_sample(latency)
+        return latency
 
     @property
-    def latency(self):
+    def latency(self) -> float:
+        if self.ping_failures > 0:
+            return inf
         return self._latency
+
+    @property
+    def latency_std(self) -> float:
+        return sqrt(self._latency_var)
+
+    def get_stats(self) -> PeerStats:
+        return PeerStats(self._latency, self._latency_var, self.score, self.bytes_send, self.bytes_receive)
+
+    def set_stats(self, stats: PeerStats) -> None:
+        self._latency = stats.latency
+        self._latency_var = stats.latency_var
+        self.score = stats.score
+        self.bytes_send = stats.bytes_send
+        self.bytes_receive = stats.bytes_receive
+
+    def _add_latency_sample(self, latency: float) -> None:
+        if self._latency == inf:
+            self._latency = latency
+            self._latency_var = 0
+            return
+        diff = latency - self._latency
+        self._latency += self._latency_alpha * diff
+        self._latency_var = (1 - self._latency_alpha) * (self._latency_var + self._latency_alpha * diff * diff)
@@ -1,29 +1,45 @@
 import asyncio
-from typing import Union, Dict, Optional, Iterator, List, TYPE_CHECKING, Any, NoReturn
+import heapq
+from typing import Union, Dict, Optional, Iterator, List, Tuple, TYPE_CHECKING, Any, NoReturn
 from logging import INFO
 from time import monotonic
 from functools import partial
+from random import uniform
+from collections import OrderedDict
 
 from cid import CIDv0, CIDv1
 
 from .peer import Peer
+from .peer_stats import PeerStats
 from .base_peer_manager import BasePeerManager
 from ..decision.ledger import Ledger
 from ..wantlist.wantlist import WantList
+from ..wantlist.remote_entry import RemoteEntry
+from ..wantlist.want_index import WantIndex
 from ..logger import get_stream_logger_colored, get_concurrent_logger
 from ..task.task import Task
+from ..queue_manager.response_queue import ResponseQueue, MemoryLimiter
 
 if TYPE_CHECKING:
     from ..network.base_network import BaseNetwork
     from .peer import BasePeer
     from ..connection_manager.base_connection_manager import BaseConnectionManager
+    from ..session.base_session_manager import BaseSessionManager
 
 
 class PeerManager(BasePeerManager):
 
     def __init__(self, connection_manager: 'BaseConnectionManager', network: 'BaseNetwork',
                  max_no_active_time: int = 3600, check_no_active_ping_period: int = 30,
-                 log_level: int = INFO, log_path: Optional[str] = None) -> None:
+                 log_level: int = INFO, log_path: Optional[str] = None,
+                 session_manager: Optional['BaseSessionManager'] = None, low_water: int = 600,
+                 high_water: int = 900, max_peers: Optional[int] = None, grace_period: float = 30,
+                 trim_period: float = 60, max_concurrent_pings: int = 32, ping_timeout: float = 10,
+                 ping_jitter: float = 0.2, max_peer_queue_bytes: Optional[int] = 8 * 1024 * 1024,
+                 max_queue_bytes: Optional[int] = 256 * 1024 * 1024, max_peer_tasks: int = 4096,
+                 max_known_peers: int = 10000) -> None:
+        if low_water > high_water:
+            raise ValueError(f'low_water: {low_water} > high_water: {high_water}')
         if log_path is None:
             self._logger = get_stream_logger_colored(__name__, log_level)
         else:
@@ -32,8 +48,31 @@ class PeerManager(BasePeerManager):
         self._network = network
         self._max_no_active_time = max_no_active_time
         self._check_no_active_ping_period = check_no_active_ping_period
+        self._session_manager = session_manager
+        self._low_water = low_water
+        self._high_water = high_water
+        self._max_peers = max_peers
+        self._grace_period = grace_period
+        self._trim_period = trim_period
+        self._max_concurrent_pings = max_concurrent_pings
+        self._ping_timeout = ping_timeout
+        self._ping_jitter = ping_jitter
+        self._max_peer_queue_bytes = max_peer_queue_bytes
+        self._max_peer_tasks = max_peer_tasks
+        self._memory_limiter = MemoryLimiter(max_queue_bytes)
+        self._ping_schedule: List[Tuple[float, str]] = []
+        self._ping_event: Optional[asyncio.Event] = None
+        self._probe_tasks: Dict[str, asyncio.Task] = {}
+        self._max_known_peers = max_known_peers
+        self._known_peers: 'OrderedDict[str, PeerStats]' = OrderedDict()
         self._peers: Dict[str, Peer] = {}
+        self._want_index = WantIndex()
         self._disconnect_task: Optional[asyncio.Task] = None
+        self._trim_task: Optional[asyncio.Task] = None
+        self._trim_event: Optional[asyncio.Event] = None
+
+    def __len__(self) -> int:
+        return len(self._peers)
 
     def __contains__(self, peer: Peer):
         return str(peer.cid) in self._peers
@@ -49,12 +88,21 @@ class PeerManager(BasePeerManager):
         self.stop()
 
     def run(self) -> None:
+        self._ping_event = asyncio.Event()
         self._disconnect_task = Task.create_task(self.disconnect_no_active_peers(),
                                                  partial(Task.base_callback, logger=self._logger))
+        self._trim_event = asyncio.Event()
+        self._trim_task = Task.create_task(self._trim_peers_loop(), partial(Task.base_callback, logger=self._logger))
 
     def stop(self) -> None:
         self._disconnect_task.cancel()
         self._disconnect_task = None
+        self._ping_event = None
+        self._trim_task.cancel()
+        self._trim_task = None
+        self._trim_event = None
+        for probe_task in self._probe_tasks.values():
+            probe_task.cancel()
 
     def get_all_peers(self) -> List[Peer]:
         return list(self._peers.values())
@@ -62,18 +110,35 @@ class PeerManager(BasePeerManager):
     def get_peer(self, peer_cid: Union[CIDv0, CIDv1]) -> Optional[Peer]:
         return self._peers.get(str(peer_cid))
 
+    def get_wanting_peers(self, block_cid: Union[CIDv0, CIDv1]) -> List[Peer]:
+        return self._want_index.get_peers(block_cid)
+
     async def connect(self, peer_cid: Union[CIDv0, CIDv1],
                       network_peer: Optional['BasePeer'] = None) -> Optional[Peer]:
         str_peer_cid = str(peer_cid)
         if str_peer_cid in self._peers:
             return
+        if self._max_peers is not None and len(self._peers) >= self._max_peers:
+            self._logger.debug('Max peers reached, reject connection, peer_cid: %s', peer_cid)
+            if network_peer is not None:
+                await network_peer.close()
+            return
         if network_peer is None:
             network_peer = await self._network.connect(peer_cid)
-            self._logger.debug(f'Connected to peer, peer_cid: {peer_cid}')
-        peer = Peer(peer_cid, network_peer, Ledger(WantList()))
+            self._logger.debug('Connected to peer, peer_cid: %s', peer_cid)
+        peer = Peer(peer_cid, network_peer, Ledger(WantList(RemoteEntry)),
+                    response_queue=ResponseQueue(self._max_peer_queue_bytes, self._memory_limiter),
+                    max_tasks=self._max_peer_tasks)
+        peer.ledger.bind(self._want_index, peer)
+        stats = self._known_peers.pop(str_peer_cid, None)
+        if stats is not None:
+            peer.set_stats(stats)
         self._connection_manager.run_message_handlers(peer, self)
         self._peers[str_peer_cid] = peer
-        self._logger.debug(f'Add new peer, peer_cid: {peer_cid}')
+        self._schedule_ping(peer, uniform(0, self._check_no_active_ping_period))
+        self._logger.debug('Add new peer, peer_cid: %s', peer_cid)
+        if len(self._peers) > self._high_water and self._trim_event is not None:
+            self._trim_event.set()
         return peer
 
     async def remove_peer(self, cid: Union[CIDv0, CIDv1]) -> bool:
@@ -82,32 +147,128 @@ class PeerManager(BasePeerManager):
         if peer is None:
             return False
         if await self._disconnect_peer(peer):
+            if self._peers.get(str_cid) is not peer:
+                return False
             del self._peers[str_cid]
-            self._logger.debug(f'Remove peer, peer_cid: {cid}')
+            peer.ledger.clear()
+            peer.response_queue.close()
+            self._remember_peer(str_cid, peer.get_stats())
+            self._logger.debug('Remove peer, peer_cid: %s', cid)
             return True
         else:
             return False
 
+    def get_peers_stats(self) -> Dict[str, PeerStats]:
+        peers_stats = dict(self._known_peers)
+        for str_peer_cid, peer in self._peers.items():
+            peers_stats[str_peer_cid] = peer.get_stats()
+        return peers_stats
+
+    def set_peers_stats(self, peers_stats: Dict[str, PeerStats]) -> None:
+        for str_peer_cid, stats in peers_stats.items():
+            peer = self._peers.get(str_peer_cid)
+            if peer is None:
+                self._remember_peer(str_peer_cid, stats)
+            else:
+                peer.set_stats(stats)
+
+    def _remember_peer(self, str_peer_cid: str, stats: PeerStats) -> None:
+        self._known_peers[str_peer_cid] = stats
+        self._known_peers.move_to_end(str_peer_cid)
+        while len(self._known_peers) > self._max_known_peers:
+            self._known_peers.popitem(last=False)
+
     async def disconnect(self) -> None:
         for peer in self:
             await self._disconnect_peer(peer)
         self._logger.debug('Disconnect all peers')
 
     async def disconnect_no_active_peers(self) -> NoReturn:
+        semaphore = asyncio.Semaphore(self._max_concurrent_pings)
+        while True:
+            now = monotonic()
+            while self._ping_schedule and self._ping_schedule[0][0] <= now:
+                next_ping, str_peer_cid = heapq.heappop(self._ping_schedule)
+                peer = self._peers.get(str_peer_cid)
+                if peer is None or peer.next_ping != next_ping:
+                    continue
+                self._schedule_ping(peer, self._check_no_active_ping_period *
+                                    uniform(1 - self._ping_jitter, 1 + self._ping_jitter))
+                if str_peer_cid in self._probe_tasks:
+                    continue
+                self._probe_tasks[str_peer_cid] = Task.create_task(
+                    self._probe_peer(peer, semaphore), partial(self._probe_peer_done, str_peer_cid=str_peer_cid))
+            if self._ping_schedule:
+                delay = min(self._ping_schedule[0][0] - now, self._check_no_active_ping_period)
+            else:
+                delay = self._check_no_active_ping_period
+            self._ping_event.clear()
+            try:
+                await asyncio.wait_for(self._ping_event.wait(), max(delay, 0))
+            except asyncio.exceptions.TimeoutError:
+                pass
+
+    async def _probe_peer(self, peer: Peer, semaphore: asyncio.Semaphore) -> None:
+        async with semaphore:
+            if monotonic() - peer.last_active > self._max_no_active_time:
+                self._logger.debug('Peer no active, peer_cid: %s', peer.cid)
+                res = await self._disconnect_peer(peer)
+                if res:
+                    self._logger.debug('Connection was terminated, peer_cid: %s', peer.cid)
+                return
+            if await peer.ping(self._ping_timeout) is None:
+                self._logger.debug('Ping failed, peer_cid: %s, failures: %d', peer.cid, peer.ping_failures)
+
+    def _probe_peer_done(self, task: asyncio.Task, str_peer_cid: str) -> None:
+        self._probe_tasks.pop(str_peer_cid, None)
+        Task.base_callback(task, self._logger)
+
+    def _schedule_ping(self, peer: Peer, delay: float) -> None:
+        peer.next_ping = monotonic() + delay
+        entry = (peer.next_ping, str(peer.cid))
+        heapq.heappush(self._ping_schedule, entry)
+        if self._ping_event is not None and self._ping_schedule[0] is entry:
+            self._ping_event.set()
+
+    async def trim_peers(self) -> int:
+        if len(self._peers) <= self._high_water:
+            return 0
+        now = monotonic()
+        candidates = [p for p in self._peers.values()
+                      if now - p.connected_at > self._grace_period and not self._is_protected(p)]
+        victims = heapq.nsmallest(len(self._peers) - self._low_water, candidates, key=self._peer_usefulness)
+        trimmed = 0
+        for peer in victims:
+            if await self.remove_peer(peer.cid):
+                trimmed += 1
+        self._logger.debug('Trim peers, trimmed: %d, peers: %d', trimmed, len(self._peers))
+        return trimmed
+
+    async def _trim_peers_loop(self) -> NoReturn:
         while True:
-            for peer in self:
-                if monotonic() - peer.last_active > self._max_no_active_time:
-                    self._logger.debug(f'Peer no active, peer_cid: {peer.cid}')
-                    res = await self._disconnect_peer(peer)
-                    if res:
-                        self._logger.debug(f'Connection was terminated, peer_cid: {peer.cid}')
-                await peer.ping()
-            await asyncio.sleep(self._check_no_active_ping_period)
+            try:
+                await asyncio.wait_for(self._trim_event.wait(), self._trim_period)
+            except asyncio.exceptions.TimeoutError:
+                pass
+            self._trim_event.clear()
+            try:
+                await self.trim_peers()
+            except asyncio.exceptions.CancelledError:
+                raise
+            except Exception as e:
+                self._logger.exception('Trim peers exception, e: %s', e)
+
+    def _is_protected(self, peer: Peer) -> bool:
+        return self._session_manager is not None and self._session_manager.has_peer(peer)
+
+    @staticmethod
+    def _peer_usefulness(peer: Peer) -> Tuple[float, int, float]:
+        return peer.peer_rank, peer.bytes_receive + peer.bytes_send, peer.last_active
 
     async def _disconnect_peer(self, peer: Peer) -> bool:
         try:
             await peer.close()
         except Exception as e:
-            self._logger.exception(f'Close connection with peer exception, peer_cid: {peer.cid}, e: {e}')
+            self._logger.exception('Close connection with peer exception, peer_cid: %s, e: %s', peer.cid, e)
             return False
         return True
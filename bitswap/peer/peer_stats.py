@@ -0,0 +1,17 @@
+from dataclasses import dataclass
+from math import inf
+
+
+@dataclass
+class PeerStats:
+
+    latency: float = inf
+    latency_var: float = 0
+    score: float = 0
+    bytes_send: int = 0
+    bytes_receive: int = 0
+
+    def decay(self, factor: float) -> None:
+        self.score *= factor
+        self.bytes_send = int(self.bytes_send * factor)
+        self.bytes_receive = int(self.bytes_receive * factor)
@@ -0,0 +1,23 @@
+from abc import ABCMeta, abstractmethod
+from typing import Union, List, Set
+
+from cid import CIDv0, CIDv1
+
+
+class BasePresenceIndex(metaclass=ABCMeta):
+
+    @abstractmethod
+    def add_have(self, block_cid: Union[CIDv0, CIDv1], peer_cid: Union[CIDv0, CIDv1]) -> None:
+        pass
+
+    @abstractmethod
+    def add_do_not_have(self, block_cid: Union[CIDv0, CIDv1], peer_cid: Union[CIDv0, CIDv1]) -> None:
+        pass
+
+    @abstractmethod
+    def get_holders(self, block_cid: Union[CIDv0, CIDv1]) -> List[Union[CIDv0, CIDv1]]:
+        pass
+
+    @abstractmethod
+    def get_non_holders(self, block_cid: Union[CIDv0, CIDv1]) -> Set[str]:
+        pass
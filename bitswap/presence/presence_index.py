@@ -0,0 +1,66 @@
+from typing import Union, List, Set, Tuple, Optional
+from collections import OrderedDict
+from time import monotonic
+
+from cid import CIDv0, CIDv1
+
+from .base_presence_index import BasePresenceIndex
+
+
+class PresenceIndex(BasePresenceIndex):
+
+    def __init__(self, ttl: float = 600, max_size: int = 100000, max_peers: int = 16) -> None:
+        self._ttl = ttl
+        self._max_size = max_size
+        self._max_peers = max_peers
+        self._entries: 'OrderedDict[str, OrderedDict[str, Tuple[Union[CIDv0, CIDv1], bool, float]]]' = \
+            OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add_have(self, block_cid: Union[CIDv0, CIDv1], peer_cid: Union[CIDv0, CIDv1]) -> None:
+        self._add(block_cid, peer_cid, True)
+
+    def add_do_not_have(self, block_cid: Union[CIDv0, CIDv1], peer_cid: Union[CIDv0, CIDv1]) -> None:
+        self._add(block_cid, peer_cid, False)
+
+    def get_holders(self, block_cid: Union[CIDv0, CIDv1]) -> List[Union[CIDv0, CIDv1]]:
+        peers = self._get_peers(str(block_cid))
+        if peers is None:
+            return []
+        return [peer_cid for peer_cid, have, _ in reversed(peers.values()) if have]
+
+    def get_non_holders(self, block_cid: Union[CIDv0, CIDv1]) -> Set[str]:
+        peers = self._get_peers(str(block_cid))
+        if peers is None:
+            return set()
+        return {str_peer_cid for str_peer_cid, (_, have, _) in peers.items() if not have}
+
+    def _add(self, block_cid: Union[CIDv0, CIDv1], peer_cid: Union[CIDv0, CIDv1], have: bool) -> None:
+        str_block_cid = str(block_cid)
+        peers = self._entries.get(str_block_cid)
+        if peers is None:
+            peers = self._entries[str_block_cid] = OrderedDict()
+            while len(self._entries) > self._max_size:
+                self._entries.popitem(last=False)
+        else:
+            self._entries.move_to_end(str_block_cid)
+        str_peer_cid = str(peer_cid)
+        peers[str_peer_cid] = (peer_cid, have, monotonic())
+        peers.move_to_end(str_peer_cid)
+        while len(peers) > self._max_peers:
+            peers.popitem(last=False)
+
+    def _get_peers(self, str_block_cid: str) -> Optional['OrderedDict[str, Tuple[Union[CIDv0, CIDv1], bool, float]]']:
+        peers = self._entries.get(str_block_cid)
+        if peers is None:
+            return
+        expire_before = monotonic() - self._ttl
+        while peers and next(iter(peers.values()))[2] < expire_before:
+            peers.popitem(last=False)
+        if not peers:
+            del self._entries[str_block_cid]
+            return
+        self._entries.move_to_end(str_block_cid)
+        return peers
@@ -0,0 +1,38 @@
+from abc import ABCMeta, abstractmethod
+from typing import Union, List, Optional, Dict, Tuple
+
+from cid import CIDv0, CIDv1
+
+
+class BaseProviderCache(metaclass=ABCMeta):
+
+    @abstractmethod
+    async def find_peers(self, block_cid: Union[CIDv0, CIDv1],
+                         root_cid: Optional[Union[CIDv0, CIDv1]] = None) -> List[Union[CIDv0, CIDv1]]:
+        pass
+
+    @abstractmethod
+    def add_provider(self, block_cid: Union[CIDv0, CIDv1], peer_cid: Union[CIDv0, CIDv1],
+                     root_cid: Optional[Union[CIDv0, CIDv1]] = None) -> None:
+        pass
+
+    @abstractmethod
+    def report_success(self, block_cid: Union[CIDv0, CIDv1], peer_cid: Union[CIDv0, CIDv1]) -> None:
+        pass
+
+    @abstractmethod
+    def report_failure(self, block_cid: Union[CIDv0, CIDv1], peer_cid: Union[CIDv0, CIDv1]) -> None:
+        pass
+
+    @abstractmethod
+    def invalidate(self, block_cid: Union[CIDv0, CIDv1]) -> bool:
+        pass
+
+    @abstractmethod
+    def dump(self) -> Dict[str, Tuple[float, List[Tuple[str, int, int]]]]:
+        pass
+
+    @abstractmethod
+    def load(self, records: Dict[str, Tuple[float, List[Tuple[str, int, int]]]], age: float = 0,
+             decay: float = 1) -> None:
+        pass
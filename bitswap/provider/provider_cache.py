@@ -0,0 +1,172 @@
+from typing import Union, Dict, List, Tuple, Optional, TYPE_CHECKING
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from logging import INFO
+from functools import partial
+from time import monotonic
+import asyncio
+
+from cid import CIDv0, CIDv1, make_cid
+
+from .base_provider_cache import BaseProviderCache
+from ..task.task import Task
+from ..logger import get_stream_logger_colored, get_concurrent_logger
+
+if TYPE_CHECKING:
+    from ..network.base_network import BaseNetwork
+
+
+@dataclass
+class ProviderRecord:
+
+    peer_cid: Union[CIDv0, CIDv1]
+    successes: int = 0
+    failures: int = 0
+
+    @property
+    def weight(self) -> float:
+        return (self.successes + 1) / (self.successes + self.failures + 2)
+
+
+@dataclass
+class ProviderCacheEntry:
+
+    expire_at: float
+    providers: Dict[str, ProviderRecord] = field(default_factory=dict)
+
+
+class ProviderCache(BaseProviderCache):
+
+    def __init__(self, network: 'BaseNetwork', ttl: float = 600, negative_ttl: float = 30,
+                 max_size: int = 10000, log_level: int = INFO, log_path: Optional[str] = None) -> None:
+        if log_path is None:
+            self._logger = get_stream_logger_colored(__name__, log_level)
+        else:
+            self._logger = get_concurrent_logger(__name__, log_path, log_level)
+        self._network = network
+        self._ttl = ttl
+        self._negative_ttl = negative_ttl
+        self._max_size = max_size
+        self._entries: 'OrderedDict[str, ProviderCacheEntry]' = OrderedDict()
+        self._in_flight: Dict[str, asyncio.Task] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, block_cid: Union[CIDv0, CIDv1]) -> bool:
+        return self._get_entry(str(block_cid)) is not None
+
+    async def find_peers(self, block_cid: Union[CIDv0, CIDv1],
+                         root_cid: Optional[Union[CIDv0, CIDv1]] = None) -> List[Union[CIDv0, CIDv1]]:
+        str_block_cid = str(block_cid)
+        entry = self._get_entry(str_block_cid)
+        if entry is None and root_cid is not None:
+            entry = self._get_entry(str(root_cid))
+            if entry is not None and not entry.providers:
+                entry = None
+        if entry is not None:
+            self._logger.debug('Provider cache hit, block_cid: %s, providers: %d', block_cid, len(entry.providers))
+            return self._sorted_providers(entry)
+        lookup_task = self._in_flight.get(str_block_cid)
+        if lookup_task is None:
+            lookup_task = Task.create_task(self._lookup(block_cid, root_cid),
+                                           partial(self._lookup_done, str_block_cid=str_block_cid))
+            self._in_flight[str_block_cid] = lookup_task
+        else:
+            self._logger.debug('Join in-flight provider lookup, block_cid: %s', block_cid)
+        entry = await asyncio.shield(lookup_task)
+        return self._sorted_providers(entry)
+
+    def add_provider(self, block_cid: Union[CIDv0, CIDv1], peer_cid: Union[CIDv0, CIDv1],
+                     root_cid: Optional[Union[CIDv0, CIDv1]] = None) -> None:
+        for str_cid in (str(block_cid),) if root_cid is None else (str(block_cid), str(root_cid)):
+            entry = self._get_entry(str_cid)
+            if entry is None:
+                entry = self._put_entry(str_cid, ProviderCacheEntry(monotonic() + self._ttl))
+            elif not entry.providers:
+                entry.expire_at = monotonic() + self._ttl
+            str_peer_cid = str(peer_cid)
+            if str_peer_cid not in entry.providers:
+                entry.providers[str_peer_cid] = ProviderRecord(peer_cid)
+
+    def report_success(self, block_cid: Union[CIDv0, CIDv1], peer_cid: Union[CIDv0, CIDv1]) -> None:
+        record = self._get_record(block_cid, peer_cid)
+        if record is not None:
+            record.successes += 1
+
+    def report_failure(self, block_cid: Union[CIDv0, CIDv1], peer_cid: Union[CIDv0, CIDv1]) -> None:
+        record = self._get_record(block_cid, peer_cid)
+        if record is not None:
+            record.failures += 1
+
+    def invalidate(self, block_cid: Union[CIDv0, CIDv1]) -> bool:
+        return self._entries.pop(str(block_cid), None) is not None
+
+    def dump(self) -> Dict[str, Tuple[float, List[Tuple[str, int, int]]]]:
+        now = monotonic()
+        return {str_cid: (entry.expire_at - now, [(str(r.peer_cid), r.successes, r.failures)
+                                                  for r in entry.providers.values()])
+                for str_cid, entry in self._entries.items() if entry.providers and entry.expire_at > now}
+
+    def load(self, records: Dict[str, Tuple[float, List[Tuple[str, int, int]]]], age: float = 0,
+             decay: float = 1) -> None:
+        now = monotonic()
+        for str_cid, (ttl, providers) in records.items():
+            if ttl - age <= 0 or str_cid in self._entries:
+                continue
+            entry = ProviderCacheEntry(now + ttl - age)
+            for str_peer_cid, successes, failures in providers:
+                entry.providers[str_peer_cid] = ProviderRecord(make_cid(str_peer_cid), round(successes * decay),
+                                                               round(failures * decay))
+            self._put_entry(str_cid, entry)
+
+    async def _lookup(self, block_cid: Union[CIDv0, CIDv1],
+                      root_cid: Optional[Union[CIDv0, CIDv1]]) -> ProviderCacheEntry:
+        str_block_cid = str(block_cid)
+        peers_cid = await self._network.find_peers(block_cid)
+        entry = self._get_entry(str_block_cid)
+        if not peers_cid:
+            self._logger.debug('Provider lookup empty, block_cid: %s', block_cid)
+            if entry is None:
+                entry = self._put_entry(str_block_cid, ProviderCacheEntry(monotonic() + self._negative_ttl))
+            return entry
+        if entry is None or not entry.providers:
+            entry = self._put_entry(str_block_cid, ProviderCacheEntry(monotonic() + self._ttl))
+        for peer_cid in peers_cid:
+            entry.providers.setdefault(str(peer_cid), ProviderRecord(peer_cid))
+            if root_cid is not None:
+                self.add_provider(root_cid, peer_cid)
+        return entry
+
+    def _lookup_done(self, task: asyncio.Task, str_block_cid: str) -> None:
+        self._in_flight.pop(str_block_cid, None)
+        Task.base_callback(task, self._logger)
+
+    def _get_entry(self, str_cid: str) -> Optional[ProviderCacheEntry]:
+        entry = self._entries.get(str_cid)
+        if entry is None:
+            return
+        if entry.expire_at < monotonic():
+            del self._entries[str_cid]
+            return
+        self._entries.move_to_end(str_cid)
+        return entry
+
+    def _put_entry(self, str_cid: str, entry: ProviderCacheEntry) -> ProviderCacheEntry:
+        self._entries[str_cid] = entry
+        self._entries.move_to_end(str_cid)
+        while len(self._entries) > self._max_size:
+            self._entries.popitem(last=False)
+        return entry
+
+    def _get_record(self, block_cid: Union[CIDv0, CIDv1],
+                    peer_cid: Union[CIDv0, CIDv1]) -> Optional[ProviderRecord]:
+        entry = self._entries.get(str(block_cid))
+        if entry is None:
+            return
+        return entry.providers.get(str(peer_cid))
+
+    @staticmethod
+    def _sorted_providers(entry: ProviderCacheEntry) -> List[Union[CIDv0, CIDv1]]:
+        # Session._connect pops from the end, so the best providers go last
+        return [r.peer_cid for r in sorted(entry.providers.values(), key=lambda r: r.weight)]
@@ -0,0 +1,100 @@
+from typing import Optional, TYPE_CHECKING
+import asyncio
+
+if TYPE_CHECKING:
+    from ..message.bitswap_message import BitswapMessage
+
+
+class MemoryLimiter:
+
+    def __init__(self, max_bytes: Optional[int] = None) -> None:
+        self.max_bytes = max_bytes
+        self.used = 0
+
+    def fits(self, size: int) -> bool:
+        return self.max_bytes is None or self.used == 0 or self.used + size <= self.max_bytes
+
+    def full(self) -> bool:
+        return self.max_bytes is not None and self.used >= self.max_bytes
+
+    def reserve(self, size: int) -> None:
+        self.used += size
+
+    def release(self, size: int) -> None:
+        self.used = max(self.used - size, 0)
+
+
+class ResponseQueue:
+
+    def __init__(self, max_bytes: Optional[int] = None, memory_limiter: Optional[MemoryLimiter] = None,
+                 wait_period: float = 0.05) -> None:
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._limiter = MemoryLimiter(max_bytes)
+        self._global_limiter = memory_limiter
+        self._wait_period = wait_period
+        self._closed = False
+        self._deferred = 0
+        self.dropped = 0
+
+    @property
+    def bytes(self) -> int:
+        return self._limiter.used
+
+    def qsize(self) -> int:
+        return self._queue.qsize()
+
+    def empty(self) -> bool:
+        return self._queue.empty()
+
+    def full(self) -> bool:
+        return self._limiter.full() or (self._global_limiter is not None and self._global_limiter.full()) or \
+            (self._deferred > 0 and not self._fits(self._deferred))
+
+    def try_put(self, message: 'BitswapMessage') -> bool:
+        size = message.size
+        if self._closed:
+            return False
+        if not self._fits(size):
+            self._deferred = size
+            return False
+        self._deferred = 0
+        self._reserve(size)
+        self._queue.put_nowait((message, size))
+        return True
+
+    async def put(self, message: 'BitswapMessage') -> bool:
+        size = message.size
+        if message.payload:
+            while not self._closed and not self._fits(size):
+                await asyncio.sleep(self._wait_period)
+        if self._closed:
+            return False
+        elif not message.want_list and not self._fits(size):
+            self.dropped += 1
+            return False
+        self._reserve(size)
+        self._queue.put_nowait((message, size))
+        return True
+
+    async def get(self) -> 'BitswapMessage':
+        message, size = await self._queue.get()
+        self._limiter.release(size)
+        if self._global_limiter is not None:
+            self._global_limiter.release(size)
+        return message
+
+    def close(self) -> None:
+        self._closed = True
+        while not self._queue.empty():
+            _, size = self._queue.get_nowait()
+            self._limiter.release(size)
+            if self._global_limiter is not None:
+                self._global_limiter.release(size)
+
+    def _fits(self, size: int) -> bool:
+        return self._limiter.fits(size) and (self._global_limiter is None or self._global_limiter.fits(size))
+
+    def _reserve(self, size: int) -> None:
+        self._limiter.reserve(size)
+        if self._global_limiter is not None:
+            self._global_limiter.reserve(size)
@@ -0,0 +1,17 @@
+from abc import ABCMeta, abstractmethod
+from typing import Any, Coroutine, Dict, Hashable
+
+
+class BaseFetchScheduler(metaclass=ABCMeta):
+
+    @abstractmethod
+    async def run(self, coro: Coroutine, session_key: Hashable, fetch_class: str, priority: int = 1) -> Any:
+        pass
+
+    @abstractmethod
+    def observe(self, size: int) -> None:
+        pass
+
+    @abstractmethod
+    def stats(self) -> Dict[str, int]:
+        pass
@@ -0,0 +1,133 @@
+from typing import Any, Coroutine, Dict, Hashable, List, Optional, Tuple
+from collections import OrderedDict
+from dataclasses import dataclass
+from itertools import count
+from logging import INFO
+import asyncio
+import heapq
+
+from .base_fetch_scheduler import BaseFetchScheduler
+from ..logger import get_stream_logger_colored, get_concurrent_logger
+
+
+@dataclass
+class FetchTicket:
+
+    session_key: Hashable
+    fetch_class: str
+    size: int
+    future: asyncio.Future
+    priority: int = 1
+
+
+class FetchScheduler(BaseFetchScheduler):
+
+    INTERACTIVE = 'interactive'
+    NORMAL = 'normal'
+    BULK = 'bulk'
+    CLASSES = (INTERACTIVE, NORMAL, BULK)
+
+    def __init__(self, max_concurrent: int = 128, max_bytes_in_flight: Optional[int] = 128 * 1024 * 1024,
+                 interactive_reserve: int = 16, block_size_estimate: int = 256 * 1024, size_alpha: float = 0.1,
+                 log_level: int = INFO, log_path: Optional[str] = None) -> None:
+        if not 0 <= interactive_reserve < max_concurrent:
+            raise ValueError(f'interactive_reserve: {interactive_reserve}, max_concurrent: {max_concurrent}')
+        if log_path is None:
+            self._logger = get_stream_logger_colored(__name__, log_level)
+        else:
+            self._logger = get_concurrent_logger(__name__, log_path, log_level)
+        self.max_concurrent = max_concurrent
+        self.max_bytes_in_flight = max_bytes_in_flight
+        self.interactive_reserve = interactive_reserve
+        self.block_size_estimate = block_size_estimate
+        self._size_alpha = size_alpha
+        self._queues: Dict[str, 'OrderedDict[Hashable, List[Tuple[int, int, FetchTicket]]]'] = \
+            {c: OrderedDict() for c in self.CLASSES}
+        self._order = count()
+        self.running = 0
+        self.bytes_in_flight = 0
+
+    @property
+    def queued(self) -> int:
+        return sum(len(waiters) for queue in self._queues.values() for waiters in queue.values())
+
+    async def run(self, coro: Coroutine, session_key: Hashable, fetch_class: str = NORMAL,
+                  priority: int = 1) -> Any:
+        try:
+            ticket = await self._acquire(session_key, fetch_class, priority)
+        except asyncio.CancelledError:
+            coro.close()
+            raise
+        try:
+            return await coro
+        finally:
+            self._release(ticket)
+
+    def observe(self, size: int) -> None:
+        self.block_size_estimate = round((1 - self._size_alpha) * self.block_size_estimate + self._size_alpha * size)
+
+    def stats(self) -> Dict[str, int]:
+        stats = {f'queued_{c}': sum(len(waiters) for waiters in self._queues[c].values()) for c in self.CLASSES}
+        stats['running'] = self.running
+        stats['bytes_in_flight'] = self.bytes_in_flight
+        return stats
+
+    async def _acquire(self, session_key: Hashable, fetch_class: str, priority: int = 1) -> FetchTicket:
+        if fetch_class not in self._queues:
+            raise ValueError(f'Unknown fetch class: {fetch_class}')
+        ticket = FetchTicket(session_key, fetch_class, self.block_size_estimate,
+                             asyncio.get_running_loop().create_future(), priority)
+        queue = self._queues[fetch_class]
+        if session_key not in queue:
+            queue[session_key] = []
+        heapq.heappush(queue[session_key], (-priority, next(self._order), ticket))
+        self._dispatch()
+        if not ticket.future.done():
+            self._logger.debug('Fetch queued, class: %s, running: %d', fetch_class, self.running)
+        try:
+            await asyncio.shield(ticket.future)
+        except asyncio.CancelledError:
+            if ticket.future.done():
+                self._release(ticket)
+            else:
+                ticket.future.cancel()
+                self._discard(ticket)
+            raise
+        return ticket
+
+    def _release(self, ticket: FetchTicket) -> None:
+        self.running -= 1
+        self.bytes_in_flight -= ticket.size
+        self._dispatch()
+
+    def _discard(self, ticket: FetchTicket) -> None:
+        queue = self._queues[ticket.fetch_class]
+        waiters = queue.get(ticket.session_key)
+        if waiters is not None:
+            waiters[:] = [waiter for waiter in waiters if waiter[2] is not ticket]
+            heapq.heapify(waiters)
+            if not waiters:
+                del queue[ticket.session_key]
+
+    def _can_start(self, fetch_class: str, size: int) -> bool:
+        limit = self.max_concurrent if fetch_class == self.INTERACTIVE else \
+            self.max_concurrent - self.interactive_reserve
+        return self.running < limit and (self.running == 0 or self.max_bytes_in_flight is None or
+                                         self.bytes_in_flight + size <= self.max_bytes_in_flight)
+
+    def _dispatch(self) -> None:
+        for fetch_class in self.CLASSES:
+            queue = self._queues[fetch_class]
+            while queue:
+                session_key, waiters = next(iter(queue.items()))
+                ticket = waiters[0][2]
+                if not self._can_start(fetch_class, ticket.size):
+                    return
+                heapq.heappop(waiters)
+                if waiters:
+                    queue.move_to_end(session_key)
+                else:
+                    del queue[session_key]
+                self.running += 1
+                self.bytes_in_flight += ticket.size
+                ticket.future.set_result(None)
@@ -1,8 +1,11 @@
 from abc import ABCMeta, abstractmethod
-from typing import Set, Generator, TYPE_CHECKING
+from typing import Set, Generator, Hashable, Union, TYPE_CHECKING
+
+from cid import CIDv0, CIDv1
 
 if TYPE_CHECKING:
     from .session import Session
+    from ..peer.peer import Peer
     from ..peer.base_peer_manager import BasePeerManager
     from ..network.base_network import BaseNetwork
 
@@ -18,3 +21,27 @@ class BaseSessionManager(metaclass=ABCMeta):
     @abstractmethod
     def create_session(self, network: 'BaseNetwork', peer_manager: 'BasePeerManager') -> 'Session':
         pass
+
+    @abstractmethod
+    def get_session(self, key: Hashable, network: 'BaseNetwork', peer_manager: 'BasePeerManager') -> 'Session':
+        pass
+
+    @abstractmethod
+    def release_session(self, key: Hashable) -> bool:
+        pass
+
+    @abstractmethod
+    def add_session_peer(self, session: 'Session', str_peer_cid: str) -> None:
+        pass
+
+    @abstractmethod
+    def remove_session_peer(self, session: 'Session', str_peer_cid: str) -> None:
+        pass
+
+    @abstractmethod
+    def remove_peer(self, peer_cid: Union[CIDv0, CIDv1]) -> int:
+        pass
+
+    @abstractmethod
+    def has_peer(self, peer: 'Peer') -> bool:
+        pass
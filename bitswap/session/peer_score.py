@@ -1,5 +1,6 @@
 from typing import TYPE_CHECKING
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from time import monotonic
 
 if TYPE_CHECKING:
     from ..peer.peer import Peer
@@ -10,6 +11,9 @@ class PeerScore:
 
     peer: 'Peer'
     _score: float = 0
+    hit_rate: float = 0
+    samples: int = 0
+    last_seen: float = field(default_factory=monotonic)
 
     def __hash__(self) -> int:
         return str(self.peer.cid).__hash__()
@@ -20,6 +24,10 @@ class PeerScore:
 
     def change_score(self, new: float, alpha: float = 0.5) -> float:
         self._score = self._ewma(self._score, new, alpha)
+        self.peer.score = self._ewma(self.peer.score, new, alpha)
+        hit = 1 if new > 0 else 0
+        self.hit_rate = hit if self.samples == 0 else self._ewma(self.hit_rate, hit, alpha)
+        self.samples += 1
         return self._score
 
     @staticmethod
@@ -1,8 +1,10 @@
-from typing import Union, Dict, Optional, List, TYPE_CHECKING
+from typing import Union, Dict, Optional, List, Iterable, Set, TYPE_CHECKING
+from collections import OrderedDict
 import weakref
 import asyncio
 from logging import INFO
 from time import monotonic
+from math import ceil, inf
 
 from cid import CIDv0, CIDv1
 
@@ -16,25 +18,58 @@ if TYPE_CHECKING:
     from ..peer.base_peer_manager import BasePeerManager
     from ..wantlist.entry import Entry
     from ..network.base_network import BaseNetwork
+    from ..provider.base_provider_cache import BaseProviderCache
+    from ..presence.base_presence_index import BasePresenceIndex
+    from .base_session_manager import BaseSessionManager
 
 
 class Session:
 
     def __init__(self, network: 'BaseNetwork', peer_manager: 'BasePeerManager',
-                 log_level: int = INFO, log_path: Optional[str] = None) -> None:
+                 log_level: int = INFO, log_path: Optional[str] = None,
+                 provider_cache: Optional['BaseProviderCache'] = None, initial_fanout: int = 8,
+                 fanout_factor: float = 2, fanout_min_timeout: float = 0.25, fanout_max_timeout: float = 1,
+                 optimistic_hit_rate: Optional[float] = 0.8, optimistic_min_samples: int = 2,
+                 presence_index: Optional['BasePresenceIndex'] = None, max_peers: Optional[int] = 256,
+                 peer_idle_timeout: Optional[float] = 600,
+                 session_manager: Optional['BaseSessionManager'] = None) -> None:
+        if initial_fanout < 1:
+            raise ValueError(f'initial_fanout: {initial_fanout} < 1')
+        if fanout_factor <= 1:
+            raise ValueError(f'fanout_factor: {fanout_factor} <= 1')
         if log_path is None:
             self._logger = get_stream_logger_colored(__name__, log_level)
         else:
             self._logger = get_concurrent_logger(__name__, log_path, log_level)
         self._network = network
         self._peer_manager = peer_manager
-        self._peers: Dict[str, PeerScore] = {}
+        self._provider_cache = provider_cache
+        self._initial_fanout = initial_fanout
+        self._fanout_factor = fanout_factor
+        self._fanout_min_timeout = fanout_min_timeout
+        self._fanout_max_timeout = fanout_max_timeout
+        self._optimistic_hit_rate = optimistic_hit_rate
+        self._optimistic_min_samples = optimistic_min_samples
+        self._presence_index = presence_index
+        self._max_peers = max_peers
+        self._peer_idle_timeout = peer_idle_timeout
+        self._session_manager = session_manager
+        self._peers: 'OrderedDict[str, PeerScore]' = OrderedDict()
         self._blocks_have: Dict[str, weakref.WeakSet] = {}
         self._blocks_pending: Dict[str, weakref.WeakSet] = {}
+        self._active: Dict[str, int] = {}
+        self._optimistic: Dict[str, str] = {}
 
     def __contains__(self, peer: 'Peer') -> bool:
         return str(peer.cid) in self._peers
 
+    def __len__(self) -> int:
+        return len(self._peers)
+
+    @property
+    def active_blocks(self) -> int:
+        return len(self._active)
+
     def get_notify_peers(self, block_cid: Union[CIDv0, CIDv1],
                          current_peer: Optional[Union[CIDv0, CIDv1]] = None) -> List['Peer']:
         str_block_cid = str(block_cid)
@@ -46,81 +81,134 @@ class Session:
 
     def add_peer(self, peer: 'Peer', block_cid: Union[CIDv0, CIDv1], have: bool = True) -> None:
         str_peer_cid = str(peer.cid)
-        str_block_cid = str(block_cid)
-        if str_peer_cid not in self._peers:
-            self._peers[str_peer_cid] = PeerScore(peer)
-            self._logger.debug(f'Add new peer to session, session: {self}, peer_cid: {str_peer_cid}')
+        peer_score = self._peers.get(str_peer_cid)
+        if peer_score is None:
+            peer_score = self._peers[str_peer_cid] = PeerScore(peer, peer.score)
+            if self._session_manager is not None:
+                self._session_manager.add_session_peer(self, str_peer_cid)
+            self._logger.debug('Add new peer to session, session: %s, peer_cid: %s', self, str_peer_cid)
+            self._evict_peers(peer_score.last_seen)
+        else:
+            self._touch_peer(str_peer_cid, peer_score)
+        if not have:
+            self._answer_optimistic(str(block_cid), str_peer_cid)
         if have:
-            if str_block_cid not in self._blocks_have:
-                self._blocks_have[str_block_cid] = weakref.WeakSet()
-            self._blocks_have[str_block_cid].add(self._peers[str(peer.cid)])
+            blocks_have = self._blocks_have.get(str(block_cid))
+            if blocks_have is not None:
+                blocks_have.add(peer_score)
 
     def change_peer_score(self, cid: Union[CIDv0, CIDv1], new: float, alpha: float = 0.5) -> bool:
         str_cid = str(cid)
-        if str_cid not in self._peers:
+        peer_score = self._peers.get(str_cid)
+        if peer_score is None:
             return False
-        self._peers[str_cid].change_score(new, alpha)
+        peer_score.change_score(new, alpha)
+        self._touch_peer(str_cid, peer_score)
         return True
 
     def remove_peer(self, cid: Union[CIDv0, CIDv1]) -> bool:
         str_cid = str(cid)
         if str_cid not in self._peers:
             return False
-        del self._peers[str_cid]
-        self._logger.debug(f'Remove peer from session, session: {self}, peer_cid: {str_cid}')
+        self._drop_peer(str_cid)
+        self._logger.debug('Remove peer from session, session: %s, peer_cid: %s', self, str_cid)
         return True
 
     def remove_peer_from_have(self, block_cid: Union[CIDv0, CIDv1], peer: 'Peer') -> bool:
         str_cid = str(block_cid)
+        self._answer_optimistic(str_cid, str(peer.cid))
         if str_cid not in self._blocks_have or peer not in self._blocks_have[str_cid]:
             return False
         self._blocks_have[str_cid].remove(peer)
         return True
 
+    def evict_peers(self) -> None:
+        self._evict_peers(monotonic())
+
     async def get(self, entry: 'Entry', connect_timeout: int = 7, peer_act_timeout: int = 5,
-                  ban_peer_timeout: int = 10) -> None:
+                  ban_peer_timeout: int = 10, root_cid: Optional[Union[CIDv0, CIDv1]] = None) -> None:
+        self.evict_peers()
         str_entry_cid = str(entry.cid)
+        self._acquire_block(str_entry_cid)
+        try:
+            await self._get(entry, str_entry_cid, connect_timeout, peer_act_timeout, ban_peer_timeout, root_cid)
+        finally:
+            self._release_block(str_entry_cid)
+
+    async def _get(self, entry: 'Entry', str_entry_cid: str, connect_timeout: int, peer_act_timeout: int,
+                   ban_peer_timeout: int, root_cid: Optional[Union[CIDv0, CIDv1]]) -> None:
         entry.add_session(self)
         ban_peers: Dict[str, float] = {}
         sent_w_block_to_peers: List[PeerScore] = []
         new_peers_cid: List[Union[CIDv0, CIDv1]] = []
-        if str_entry_cid not in self._blocks_have:
-            self._blocks_have[str_entry_cid] = weakref.WeakSet()
-        if str_entry_cid not in self._blocks_pending:
-            self._blocks_pending[str_entry_cid] = weakref.WeakSet()
+        fanout_peers: List['Peer'] = []
+        asked_peers: List['Peer'] = []
+        considered_peers: Set[str] = set()
+        miss_timer: Optional[asyncio.TimerHandle] = None
+        fanout_size = self._initial_fanout
         if not self._peers:
-            self._logger.debug(f'Session has not peers, session: {self}')
+            self._logger.debug('Session has not peers, session: %s', self)
             all_peers = self._peer_manager.get_all_peers()
             if not all_peers:
-                self._logger.debug(f'No active connections with peers, session: {self}')
+                self._logger.debug('No active connections with peers, session: %s', self)
+                new_peers_cid = self._get_known_holders(entry.cid, root_cid)
                 while True:
-                    new_peers_cid = await self._network.find_peers(entry.cid)
                     if not new_peers_cid:
-                        self._logger.warning(f'Cant find peers, block_cid: {entry.cid}, session: {self}')
+                        new_peers_cid = await self._find_peers(entry.cid, root_cid)
+                    if not new_peers_cid:
+                        self._logger.warning('Cant find peers, block_cid: %s, session: %s', entry.cid, self)
                         await asyncio.sleep(peer_act_timeout)
                     elif await self._connect(new_peers_cid, ban_peers, connect_timeout, ban_peer_timeout) is None:
-                        self._logger.warning(f'Cant connect to peers, session: {self}')
+                        self._logger.warning('Cant connect to peers, session: %s', self)
                         await asyncio.sleep(peer_act_timeout)
                     else:
                         break
                 all_peers = self._peer_manager.get_all_peers()
-            await Sender.send_entries((entry,), all_peers, ProtoBuff.WantType.Have)
+            considered_peers.update(str(p.cid) for p in all_peers)
+            fanout_peers = self._rank_peers(all_peers, entry.cid, root_cid)
+            asked_peers = fanout_peers[:fanout_size]
+            del fanout_peers[:fanout_size]
+            await Sender.send_entries((entry,), asked_peers, ProtoBuff.WantType.Have)
         else:
-            await Sender.send_entries((entry,), (p.peer for p in self._peers.values()), ProtoBuff.WantType.Have)
+            optimistic_peer = self._get_optimistic_peer()
+            if optimistic_peer is not None:
+                self._logger.debug('Optimistic want-block, block_cid: %s, peer_cid: %s',
+                                   entry.cid, optimistic_peer.peer.cid)
+                self._blocks_pending[str_entry_cid].add(optimistic_peer)
+                sent_w_block_to_peers.append(optimistic_peer)
+                self._optimistic[str_entry_cid] = str(optimistic_peer.peer.cid)
+                miss_timer = asyncio.get_running_loop().call_later(peer_act_timeout, self._optimistic_timeout,
+                                                                   str_entry_cid)
+                await Sender.send_entries((entry,), (optimistic_peer.peer,), ProtoBuff.WantType.Block)
+            await Sender.send_entries((entry,), (p.peer for p in self._peers.values() if p is not optimistic_peer),
+                                      ProtoBuff.WantType.Have)
         try:
-            while entry.block is None:
+            while not entry.has_block:
+                timeout = self._fanout_timeout(asked_peers) if fanout_peers else peer_act_timeout
                 try:
-                    have_peer = await asyncio.wait_for(self._wait_for_have_peer(entry.cid), peer_act_timeout)
+                    have_peer = await asyncio.wait_for(self._wait_for_have_peer(entry.cid), timeout)
                 except asyncio.exceptions.TimeoutError:
-                    self._logger.debug(f'Wait have timeout, session: {self}')
+                    if considered_peers:
+                        fanout_peers = self._merge_new_peers(fanout_peers, considered_peers, entry.cid, root_cid)
+                    if fanout_peers:
+                        fanout_size = ceil(fanout_size * self._fanout_factor)
+                        asked_peers = [p for p in fanout_peers[:fanout_size] if p in self._peer_manager]
+                        del fanout_peers[:fanout_size]
+                        self._logger.debug('Widen want-have fan-out, block_cid: %s, peers: %d',
+                                           entry.cid, len(asked_peers))
+                        await Sender.send_entries((entry,), asked_peers, ProtoBuff.WantType.Have)
+                        continue
+                    self._logger.debug('Wait have timeout, session: %s', self)
                     new_peer = await self._connect(new_peers_cid, ban_peers, connect_timeout, ban_peer_timeout)
                     if new_peer is None:
-                        new_peers_cid = await self._network.find_peers(entry.cid)
+                        new_peers_cid = await self._find_peers(entry.cid, root_cid)
                         new_peer = await self._connect(new_peers_cid, ban_peers, connect_timeout, ban_peer_timeout)
                     if new_peer is not None:
                         await Sender.send_entries((entry,), (new_peer,), ProtoBuff.WantType.Have)
                 else:
-                    self._blocks_have[str_entry_cid].remove(have_peer)
+                    self._blocks_have[str_entry_cid].discard(have_peer)
+                    if str(have_peer.peer.cid) not in self._peers:
+                        continue
                     if have_peer not in self._blocks_pending[str_entry_cid] and have_peer.peer in self._peer_manager:
                         self._blocks_pending[str_entry_cid].add(have_peer)
                         sent_w_block_to_peers.append(have_peer)
@@ -128,11 +216,73 @@ class Session:
                         try:
                             await asyncio.wait_for(self._wait_for_block(entry), peer_act_timeout)
                         except asyncio.exceptions.TimeoutError:
-                            self._logger.debug(f'Block wait timeout, block_cid: {entry.cid}')
+                            self._logger.debug('Block wait timeout, block_cid: %s', entry.cid)
         finally:
+            if miss_timer is not None:
+                miss_timer.cancel()
             for peer in sent_w_block_to_peers:
-                if peer in self._blocks_pending[str_entry_cid]:
-                    self._blocks_pending[str_entry_cid].remove(peer)
+                self._blocks_pending[str_entry_cid].discard(peer)
+
+    def _acquire_block(self, str_block_cid: str) -> None:
+        count = self._active.get(str_block_cid, 0)
+        if count == 0:
+            self._blocks_have[str_block_cid] = weakref.WeakSet()
+            self._blocks_pending[str_block_cid] = weakref.WeakSet()
+        self._active[str_block_cid] = count + 1
+
+    def _release_block(self, str_block_cid: str) -> None:
+        count = self._active.get(str_block_cid, 0) - 1
+        if count > 0:
+            self._active[str_block_cid] = count
+            return
+        self._active.pop(str_block_cid, None)
+        self._optimistic.pop(str_block_cid, None)
+        self._blocks_have.pop(str_block_cid, None)
+        self._blocks_pending.pop(str_block_cid, None)
+
+    def _answer_optimistic(self, str_block_cid: str, str_peer_cid: str) -> None:
+        if self._optimistic.get(str_block_cid) == str_peer_cid:
+            del self._optimistic[str_block_cid]
+
+    def _optimistic_timeout(self, str_block_cid: str) -> None:
+        str_peer_cid = self._optimistic.pop(str_block_cid, None)
+        peer_score = self._peers.get(str_peer_cid) if str_peer_cid is not None else None
+        if peer_score is not None:
+            peer_score.change_score(0)
+            self._logger.debug('Optimistic want-block timeout, block_cid: %s, peer_cid: %s',
+                               str_block_cid, str_peer_cid)
+
+    def _touch_peer(self, str_peer_cid: str, peer_score: PeerScore) -> None:
+        peer_score.last_seen = monotonic()
+        self._peers.move_to_end(str_peer_cid)
+
+    def _evict_peers(self, now: float) -> None:
+        if self._peer_idle_timeout is not None:
+            while self._peers:
+                str_peer_cid, peer_score = next(iter(self._peers.items()))
+                if now - peer_score.last_seen < self._peer_idle_timeout:
+                    break
+                self._drop_peer(str_peer_cid)
+                self._logger.debug('Evict idle peer from session, session: %s, peer_cid: %s', self, str_peer_cid)
+        if self._max_peers is not None:
+            while len(self._peers) > self._max_peers:
+                str_peer_cid = next(iter(self._peers))
+                self._drop_peer(str_peer_cid)
+                self._logger.debug('Evict peer from full session, session: %s, peer_cid: %s', self, str_peer_cid)
+
+    def _drop_peer(self, str_peer_cid: str) -> None:
+        peer_score = self._peers.pop(str_peer_cid)
+        for blocks_cont in self._blocks_have, self._blocks_pending:
+            for peers in blocks_cont.values():
+                peers.discard(peer_score)
+        if self._session_manager is not None:
+            self._session_manager.remove_session_peer(self, str_peer_cid)
+
+    async def _find_peers(self, block_cid: Union[CIDv0, CIDv1],
+                          root_cid: Optional[Union[CIDv0, CIDv1]] = None) -> List[Union[CIDv0, CIDv1]]:
+        if self._provider_cache is None:
+            return await self._network.find_peers(block_cid)
+        return await self._provider_cache.find_peers(block_cid, root_cid)
 
     async def _connect(self, peers_cid: List[Union[CIDv0, CIDv1]], ban_peers: Dict[str, float],
                        connect_timeout: int, ban_peer_timeout: int) -> Optional['Peer']:
@@ -150,15 +300,61 @@ class Session:
                     if peer is not None:
                         break
                 except asyncio.exceptions.TimeoutError:
-                    self._logger.debug(f'Connect timeout, peer_cid: {p_cid}')
+                    self._logger.debug('Connect timeout, peer_cid: %s', p_cid)
                     ban_peers[str(p_cid)] = monotonic()
                 except Exception as e:
-                    self._logger.debug(f'Connect exception, peer_cid: {p_cid}, e: {e}')
+                    self._logger.debug('Connect exception, peer_cid: %s, e: %s', p_cid, e)
                     ban_peers[str(p_cid)] = monotonic()
         else:
             return
         return peer
 
+    def _rank_peers(self, peers: Iterable['Peer'], block_cid: Union[CIDv0, CIDv1],
+                    root_cid: Optional[Union[CIDv0, CIDv1]] = None) -> List['Peer']:
+        if self._presence_index is None:
+            return sorted(peers, key=lambda p: (-p.score, p.latency))
+        holders = {str(peer_cid) for peer_cid in self._get_known_holders(block_cid, root_cid)}
+        non_holders = self._presence_index.get_non_holders(block_cid)
+
+        def rank(peer: 'Peer') -> tuple:
+            str_peer_cid = str(peer.cid)
+            return str_peer_cid not in holders, str_peer_cid in non_holders, -peer.score, peer.latency
+
+        return sorted(peers, key=rank)
+
+    def _merge_new_peers(self, fanout_peers: List['Peer'], considered_peers: Set[str],
+                         block_cid: Union[CIDv0, CIDv1],
+                         root_cid: Optional[Union[CIDv0, CIDv1]] = None) -> List['Peer']:
+        new_peers = [p for p in self._peer_manager.get_all_peers() if str(p.cid) not in considered_peers]
+        if not new_peers:
+            return fanout_peers
+        considered_peers.update(str(p.cid) for p in new_peers)
+        return self._rank_peers(fanout_peers + new_peers, block_cid, root_cid)
+
+    def _get_known_holders(self, block_cid: Union[CIDv0, CIDv1],
+                           root_cid: Optional[Union[CIDv0, CIDv1]] = None) -> List[Union[CIDv0, CIDv1]]:
+        if self._presence_index is None:
+            return []
+        holders = self._presence_index.get_holders(block_cid)
+        if root_cid is not None:
+            holders.extend(self._presence_index.get_holders(root_cid))
+        return holders
+
+    def _fanout_timeout(self, peers: List['Peer']) -> float:
+        timeouts = [p.latency + 4 * p.latency_std for p in peers if p.latency < inf]
+        if not timeouts:
+            return self._fanout_max_timeout
+        return min(max(max(timeouts), self._fanout_min_timeout), self._fanout_max_timeout)
+
+    def _get_optimistic_peer(self) -> Optional[PeerScore]:
+        if self._optimistic_hit_rate is None:
+            return
+        candidates = [p for p in self._peers.values() if p.samples >= self._optimistic_min_samples and
+                      p.hit_rate >= self._optimistic_hit_rate and p.peer in self._peer_manager]
+        if not candidates:
+            return
+        return max(candidates, key=lambda p: (p.hit_rate, p.score, -p.peer.latency))
+
     def _get_peer_with_max_score(self, cid: Union[CIDv0, CIDv1]) -> PeerScore:
         return max(self._blocks_have[str(cid)], key=lambda p: (p.score, -p.peer.latency))
 
@@ -170,6 +366,6 @@ class Session:
 
     @staticmethod
     async def _wait_for_block(entry: 'Entry', period: float = 0.1) -> Optional[bytes]:
-        while entry.block is None:
+        while not entry.has_block:
             await asyncio.sleep(period)
         return entry.block
@@ -1,8 +1,12 @@
-from typing import Generator, TYPE_CHECKING, Optional
+from typing import Generator, Hashable, Tuple, Dict, Union, TYPE_CHECKING, Optional
+from collections import OrderedDict
 from logging import INFO
+from time import monotonic
 
 import weakref
 
+from cid import CIDv0, CIDv1
+
 from .base_session_manager import BaseSessionManager
 from .session import Session
 from ..logger import get_stream_logger_colored, get_concurrent_logger
@@ -10,24 +14,111 @@ from ..logger import get_stream_logger_colored, get_concurrent_logger
 if TYPE_CHECKING:
     from ..network.base_network import BaseNetwork
     from ..peer.base_peer_manager import BasePeerManager
+    from ..provider.base_provider_cache import BaseProviderCache
+    from ..peer.peer import Peer
+    from ..presence.base_presence_index import BasePresenceIndex
 
 
 class SessionManager(BaseSessionManager):
 
-    def __init__(self, log_level: int = INFO, log_path: Optional[str] = None) -> None:
+    def __init__(self, log_level: int = INFO, log_path: Optional[str] = None,
+                 provider_cache: Optional['BaseProviderCache'] = None, session_idle_timeout: float = 300,
+                 max_keyed_sessions: int = 1024, initial_fanout: int = 8, fanout_factor: float = 2,
+                 fanout_min_timeout: float = 0.25, fanout_max_timeout: float = 1,
+                 optimistic_hit_rate: Optional[float] = 0.8, optimistic_min_samples: int = 2,
+                 presence_index: Optional['BasePresenceIndex'] = None, max_session_peers: Optional[int] = 256,
+                 session_peer_idle_timeout: Optional[float] = 600) -> None:
         if log_path is None:
             self._logger = get_stream_logger_colored(__name__, log_level)
         else:
             self._logger = get_concurrent_logger(__name__, log_path, log_level)
         self._log_level = log_level
         self._log_path = log_path
+        self._provider_cache = provider_cache
+        self._session_idle_timeout = session_idle_timeout
+        self._max_keyed_sessions = max_keyed_sessions
+        self._initial_fanout = initial_fanout
+        self._fanout_factor = fanout_factor
+        self._fanout_min_timeout = fanout_min_timeout
+        self._fanout_max_timeout = fanout_max_timeout
+        self._optimistic_hit_rate = optimistic_hit_rate
+        self._optimistic_min_samples = optimistic_min_samples
+        self._presence_index = presence_index
+        self._max_session_peers = max_session_peers
+        self._session_peer_idle_timeout = session_peer_idle_timeout
+        self._keyed_sessions: 'OrderedDict[Hashable, Tuple[Session, float]]' = OrderedDict()
         self.sessions = weakref.WeakSet()
+        self._peer_sessions: Dict[str, weakref.WeakSet] = {}
 
     def __iter__(self) -> Generator[Session, None, None]:
         return self.sessions.__iter__()
 
     def create_session(self, network: 'BaseNetwork', peer_manager: 'BasePeerManager') -> Session:
-        new_session = Session(network, peer_manager, self._log_level, self._log_path)
+        new_session = Session(network, peer_manager, self._log_level, self._log_path, self._provider_cache,
+                              self._initial_fanout, self._fanout_factor, self._fanout_min_timeout,
+                              self._fanout_max_timeout, self._optimistic_hit_rate, self._optimistic_min_samples,
+                              self._presence_index, self._max_session_peers, self._session_peer_idle_timeout,
+                              self)
         self.sessions.add(new_session)
-        self._logger.debug(f'New session created, session: {new_session}')
+        self._logger.debug('New session created, session: %s', new_session)
         return new_session
+
+    def get_session(self, key: Hashable, network: 'BaseNetwork', peer_manager: 'BasePeerManager') -> Session:
+        now = monotonic()
+        self._expire_sessions(now)
+        keyed = self._keyed_sessions.get(key)
+        if keyed is None:
+            session = self.create_session(network, peer_manager)
+            if len(self._keyed_sessions) >= self._max_keyed_sessions:
+                self._keyed_sessions.popitem(last=False)
+            self._logger.debug('Session bound to key, key: %s, session: %s', key, session)
+        else:
+            session = keyed[0]
+        self._keyed_sessions[key] = (session, now)
+        self._keyed_sessions.move_to_end(key)
+        return session
+
+    def release_session(self, key: Hashable) -> bool:
+        return self._keyed_sessions.pop(key, None) is not None
+
+    def _expire_sessions(self, now: float) -> None:
+        while self._keyed_sessions:
+            key, (session, last_used) = next(iter(self._keyed_sessions.items()))
+            if now - last_used < self._session_idle_timeout:
+                break
+            del self._keyed_sessions[key]
+            self._logger.debug('Keyed session expired, key: %s, session: %s', key, session)
+
+    def add_session_peer(self, session: Session, str_peer_cid: str) -> None:
+        sessions = self._peer_sessions.get(str_peer_cid)
+        if sessions is None:
+            sessions = self._peer_sessions[str_peer_cid] = weakref.WeakSet()
+        sessions.add(session)
+
+    def remove_session_peer(self, session: Session, str_peer_cid: str) -> None:
+        sessions = self._peer_sessions.get(str_peer_cid)
+        if sessions is None:
+            return
+        sessions.discard(session)
+        if not sessions:
+            del self._peer_sessions[str_peer_cid]
+
+    def remove_peer(self, peer_cid: Union[CIDv0, CIDv1]) -> int:
+        sessions = self._peer_sessions.pop(str(peer_cid), None)
+        if sessions is None:
+            return 0
+        removed = 0
+        for session in list(sessions):
+            removed += session.remove_peer(peer_cid)
+        self._logger.debug('Remove peer from sessions, peer_cid: %s, sessions: %s', peer_cid, removed)
+        return removed
+
+    def has_peer(self, peer: 'Peer') -> bool:
+        str_peer_cid = str(peer.cid)
+        sessions = self._peer_sessions.get(str_peer_cid)
+        if sessions is None:
+            return False
+        for session in list(sessions):
+            session.evict_peers()
+        sessions = self._peer_sessions.get(str_peer_cid)
+        return sessions is not None and len(sessions) > 0
@@ -0,0 +1,21 @@
+from abc import ABCMeta, abstractmethod
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from ..peer.peer import Peer
+    from ..peer.base_peer_manager import BasePeerManager
+
+
+class BaseShardPool(metaclass=ABCMeta):
+
+    @abstractmethod
+    def run(self, peer_manager: 'BasePeerManager') -> None:
+        pass
+
+    @abstractmethod
+    async def stop(self) -> None:
+        pass
+
+    @abstractmethod
+    async def dispatch(self, peer: 'Peer', raw_message: bytes) -> None:
+        pass
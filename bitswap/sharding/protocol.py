@@ -0,0 +1,80 @@
+from typing import List, Tuple
+from struct import Struct
+
+MESSAGE = 0x01
+STOP = 0x02
+RESPONSE = 0x11
+RECEIVED = 0x12
+ERROR = 0x13
+
+_kind = Struct('>B')
+_length = Struct('>I')
+_counts = Struct('>II')
+_presence_type = Struct('>B')
+
+
+def _pack_bytes(value: bytes) -> bytes:
+    return _length.pack(len(value)) + value
+
+
+def _unpack_bytes(frame: bytes, offset: int) -> Tuple[bytes, int]:
+    length, = _length.unpack_from(frame, offset)
+    offset += _length.size
+    return frame[offset:offset + length], offset + length
+
+
+def unpack_header(frame: bytes) -> Tuple[int, str, int]:
+    kind, = _kind.unpack_from(frame, 0)
+    if kind == STOP:
+        return kind, '', _kind.size
+    peer_cid, offset = _unpack_bytes(frame, _kind.size)
+    return kind, peer_cid.decode(), offset
+
+
+def pack_message(peer_cid: str, raw_message: bytes) -> bytes:
+    return _kind.pack(MESSAGE) + _pack_bytes(peer_cid.encode()) + raw_message
+
+
+def unpack_message(frame: bytes, offset: int) -> bytes:
+    return frame[offset:]
+
+
+def pack_stop() -> bytes:
+    return _kind.pack(STOP)
+
+
+def pack_content(kind: int, peer_cid: str, blocks: List[Tuple[bytes, bytes]],
+                 presences: List[Tuple[bytes, int]]) -> bytes:
+    parts = [_kind.pack(kind), _pack_bytes(peer_cid.encode()), _counts.pack(len(blocks), len(presences))]
+    for cid, data in blocks:
+        parts.append(_pack_bytes(cid))
+        parts.append(_pack_bytes(data))
+    for cid, presence_type in presences:
+        parts.append(_pack_bytes(cid))
+        parts.append(_presence_type.pack(presence_type))
+    return b''.join(parts)
+
+
+def unpack_content(frame: bytes, offset: int) -> Tuple[List[Tuple[bytes, bytes]], List[Tuple[bytes, int]]]:
+    blocks_count, presences_count = _counts.unpack_from(frame, offset)
+    offset += _counts.size
+    blocks = []
+    for _ in range(blocks_count):
+        cid, offset = _unpack_bytes(frame, offset)
+        data, offset = _unpack_bytes(frame, offset)
+        blocks.append((cid, data))
+    presences = []
+    for _ in range(presences_count):
+        cid, offset = _unpack_bytes(frame, offset)
+        presence_type, = _presence_type.unpack_from(frame, offset)
+        offset += _presence_type.size
+        presences.append((cid, presence_type))
+    return blocks, presences
+
+
+def pack_error(peer_cid: str, error: str) -> bytes:
+    return _kind.pack(ERROR) + _pack_bytes(peer_cid.encode()) + error.encode()
+
+
+def unpack_error(frame: bytes, offset: int) -> str:
+    return frame[offset:].decode(errors='replace')
@@ -0,0 +1,29 @@
+from typing import Union, Dict
+
+from cid import CIDv0, CIDv1
+
+from ..block_storage.base_block_storage import BaseBlockStorage
+
+
+class ReadOnlyBlockStorage(BaseBlockStorage):
+
+    def __init__(self, block_storage: BaseBlockStorage) -> None:
+        self._block_storage = block_storage
+
+    async def get(self, cid: Union[CIDv0, CIDv1]) -> bytes:
+        return await self._block_storage.get(cid)
+
+    async def put(self, cid: Union[CIDv0, CIDv1], block: bytes) -> None:
+        raise PermissionError(f'read-only block storage, cid: {cid}')
+
+    async def delete(self, cid: Union[CIDv0, CIDv1]) -> None:
+        raise PermissionError(f'read-only block storage, cid: {cid}')
+
+    async def put_many(self, blocks: Dict[Union[CIDv0, CIDv1], bytes]) -> None:
+        raise PermissionError('read-only block storage')
+
+    def has(self, cid: Union[CIDv0, CIDv1]) -> bool:
+        return self._block_storage.has(cid)
+
+    async def size(self, cid: Union[CIDv0, CIDv1]) -> int:
+        return await self._block_storage.size(cid)
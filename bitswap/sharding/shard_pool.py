@@ -0,0 +1,159 @@
+from typing import Callable, List, Optional, TYPE_CHECKING
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing.connection import Connection
+from dataclasses import dataclass, field
+from functools import partial
+from logging import INFO
+from zlib import crc32
+import asyncio
+import multiprocessing
+import os
+import threading
+
+from cid import make_cid
+
+from .base_shard_pool import BaseShardPool
+from .protocol import RESPONSE, RECEIVED, ERROR, unpack_header, unpack_content, unpack_error, pack_message, \
+    pack_stop
+from .shard_worker import run_worker
+from ..message.bitswap_message import BitswapMessage
+from ..data_structure.block import Block
+from ..task.task import Task
+from ..logger import get_stream_logger_colored, get_concurrent_logger
+
+if TYPE_CHECKING:
+    from multiprocessing.process import BaseProcess
+    from ..peer.peer import Peer
+    from ..peer.base_peer_manager import BasePeerManager
+    from ..decision.base_engine import BaseEngine
+    from ..block_storage.base_block_storage import BaseBlockStorage
+
+
+@dataclass
+class Shard:
+
+    process: 'BaseProcess'
+    conn: Connection
+    queue: asyncio.Queue
+    send_task: Optional[asyncio.Task] = None
+    receive_task: Optional[asyncio.Task] = None
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+
+class ShardPool(BaseShardPool):
+
+    def __init__(self, engine: 'BaseEngine', storage_factory: Callable[[], 'BaseBlockStorage'],
+                 workers: Optional[int] = None, max_block_size_have_to_block: int = 1024,
+                 max_response_bytes: int = 2 * 1024 * 1024, max_pending: int = 1024, stop_timeout: float = 5,
+                 log_level: int = INFO, log_path: Optional[str] = None) -> None:
+        if log_path is None:
+            self._logger = get_stream_logger_colored(__name__, log_level)
+        else:
+            self._logger = get_concurrent_logger(__name__, log_path, log_level)
+        self._engine = engine
+        self._storage_factory = storage_factory
+        self.workers = workers if workers is not None else os.cpu_count() or 1
+        self._max_block_size_have_to_block = max_block_size_have_to_block
+        self._max_response_bytes = max_response_bytes
+        self._max_pending = max_pending
+        self._stop_timeout = stop_timeout
+        self._shards: List[Shard] = []
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def __len__(self) -> int:
+        return len(self._shards)
+
+    def run(self, peer_manager: 'BasePeerManager') -> None:
+        if self._shards:
+            return
+        context = multiprocessing.get_context('spawn')
+        self._executor = ThreadPoolExecutor(2 * self.workers, thread_name_prefix='bitswap-shard')
+        for i in range(self.workers):
+            parent_conn, child_conn = context.Pipe()
+            process = context.Process(target=run_worker, name=f'bitswap-shard-{i}', daemon=True,
+                                      args=(child_conn, self._storage_factory, self._max_block_size_have_to_block,
+                                            self._max_response_bytes))
+            process.start()
+            child_conn.close()
+            shard = Shard(process, parent_conn, asyncio.Queue(self._max_pending))
+            shard.send_task = Task.create_task(self._send_loop(shard),
+                                               partial(Task.base_callback, logger=self._logger))
+            shard.receive_task = Task.create_task(self._receive_loop(shard, peer_manager),
+                                                  partial(Task.base_callback, logger=self._logger))
+            self._shards.append(shard)
+        self._logger.info('Shard workers started, workers: %d', self.workers)
+        self._logger.warning('Shard workers answer wants directly, ledgers, relay, serving strategy and storage '
+                             'access tracking are bypassed')
+
+    async def stop(self) -> None:
+        loop = asyncio.get_running_loop()
+        for shard in self._shards:
+            shard.send_task.cancel()
+            try:
+                await loop.run_in_executor(self._executor, ShardPool._send_frame, shard, pack_stop())
+            except (OSError, ValueError):
+                pass
+        for shard in self._shards:
+            await loop.run_in_executor(self._executor, shard.process.join, self._stop_timeout)
+            if shard.process.is_alive():
+                self._logger.warning('Shard worker did not stop, terminate, pid: %s', shard.process.pid)
+                shard.process.terminate()
+            shard.receive_task.cancel()
+            shard.conn.close()
+        self._shards = []
+        self._executor.shutdown(wait=False)
+        self._executor = None
+
+    async def dispatch(self, peer: 'Peer', raw_message: bytes) -> None:
+        str_peer_cid = str(peer.cid)
+        shard = self._shards[crc32(str_peer_cid.encode()) % len(self._shards)]
+        await shard.queue.put(pack_message(str_peer_cid, raw_message))
+
+    async def _send_loop(self, shard: Shard) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            frame = await shard.queue.get()
+            await loop.run_in_executor(self._executor, ShardPool._send_frame, shard, frame)
+
+    async def _receive_loop(self, shard: Shard, peer_manager: 'BasePeerManager') -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                frame = await loop.run_in_executor(self._executor, shard.conn.recv_bytes)
+            except (EOFError, OSError):
+                self._logger.debug('Shard worker connection closed, pid: %s', shard.process.pid)
+                return
+            try:
+                await self._handle_frame(frame, peer_manager)
+            except asyncio.exceptions.CancelledError:
+                raise
+            except Exception as e:
+                self._logger.exception('Handle shard frame exception, e: %s', e)
+
+    async def _handle_frame(self, frame: bytes, peer_manager: 'BasePeerManager') -> None:
+        kind, str_peer_cid, offset = unpack_header(frame)
+        if kind == ERROR:
+            self._logger.warning('Shard worker error, peer_cid: %s, e: %s', str_peer_cid, unpack_error(frame, offset))
+            return
+        peer = peer_manager.get_peer(make_cid(str_peer_cid))
+        if peer is None:
+            return
+        blocks, presences = unpack_content(frame, offset)
+        bit_message = BitswapMessage(False)
+        for cid, data in blocks:
+            bit_message.add_block(Block(make_cid(cid), data))
+        for cid, presence_type in presences:
+            bit_message.add_block_presence(make_cid(cid), presence_type)
+        if kind == RESPONSE:
+            if peer.response_queue.try_put(bit_message):
+                peer.bytes_send += sum(len(block) for block in bit_message.payload.values())
+            else:
+                self._logger.debug('Response queue full, drop shard response, peer_cid: %s', str_peer_cid)
+        elif kind == RECEIVED:
+            await self._engine.wait_ready()
+            self._engine.handle_bit_swap_message(peer, bit_message, peer_manager)
+
+    @staticmethod
+    def _send_frame(shard: Shard, frame: bytes) -> None:
+        with shard.lock:
+            shard.conn.send_bytes(frame)
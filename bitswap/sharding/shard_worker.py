@@ -0,0 +1,96 @@
+from typing import Callable, List, Tuple, Optional, TYPE_CHECKING
+from multiprocessing.connection import Connection
+import asyncio
+
+from .protocol import MESSAGE, STOP, RESPONSE, RECEIVED, unpack_header, unpack_message, pack_content, pack_error
+from .read_only_storage import ReadOnlyBlockStorage
+from ..message.message_decoder import MessageDecoder
+from ..message.proto_buff import ProtoBuff
+
+if TYPE_CHECKING:
+    from ..block_storage.base_block_storage import BaseBlockStorage
+    from ..message.bitswap_message import BitswapMessage
+    from ..message.message_entry import MessageEntry
+
+
+class ShardWorker:
+
+    def __init__(self, block_storage: 'BaseBlockStorage', max_block_size_have_to_block: int = 1024,
+                 max_response_bytes: int = 2 * 1024 * 1024) -> None:
+        self._block_storage = block_storage
+        self._max_block_size_have_to_block = max_block_size_have_to_block
+        self._max_response_bytes = max_response_bytes
+
+    async def handle(self, frame: bytes) -> List[bytes]:
+        kind, peer_cid, offset = unpack_header(frame)
+        if kind != MESSAGE:
+            return [pack_error(peer_cid, f'unexpected frame kind: {kind}')]
+        try:
+            message = MessageDecoder.deserialize(unpack_message(frame, offset))
+            frames = []
+            if message.payload or message.block_presences:
+                frames.append(pack_content(RECEIVED, peer_cid,
+                                           [(cid.encode(), block.data) for cid, block in message.payload.items()],
+                                           [(cid.encode(), presence_type)
+                                            for cid, presence_type in message.block_presences.items()]))
+            frames.extend(await self._serve(peer_cid, message))
+            return frames
+        except Exception as e:
+            return [pack_error(peer_cid, repr(e))]
+
+    async def _serve(self, peer_cid: str, message: 'BitswapMessage') -> List[bytes]:
+        frames = []
+        blocks: List[Tuple[bytes, bytes]] = []
+        presences: List[Tuple[bytes, int]] = []
+        size = 0
+        for entry in message.want_list.values():
+            if entry.cancel:
+                continue
+            block, presence_type = await self._answer(entry)
+            if block is not None:
+                if blocks and size + len(block) > self._max_response_bytes:
+                    frames.append(pack_content(RESPONSE, peer_cid, blocks, presences))
+                    blocks, presences, size = [], [], 0
+                blocks.append((entry.cid.encode(), block))
+                size += len(block)
+            elif presence_type is not None:
+                presences.append((entry.cid.encode(), presence_type))
+        if blocks or presences:
+            frames.append(pack_content(RESPONSE, peer_cid, blocks, presences))
+        return frames
+
+    async def _answer(self, entry: 'MessageEntry') -> Tuple[Optional[bytes], Optional[int]]:
+        has = self._block_storage.has(entry.cid)
+        if entry.want_type == ProtoBuff.WantType.Block:
+            if has:
+                return await self._block_storage.get(entry.cid), None
+            return None, ProtoBuff.BlockPresenceType.DontHave
+        if has:
+            if await self._block_storage.size(entry.cid) <= self._max_block_size_have_to_block:
+                return await self._block_storage.get(entry.cid), None
+            return None, ProtoBuff.BlockPresenceType.Have
+        if entry.send_do_not_have:
+            return None, ProtoBuff.BlockPresenceType.DontHave
+        return None, None
+
+
+def run_worker(conn: Connection, storage_factory: Callable[[], 'BaseBlockStorage'],
+               max_block_size_have_to_block: int = 1024, max_response_bytes: int = 2 * 1024 * 1024) -> None:
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    worker = ShardWorker(ReadOnlyBlockStorage(storage_factory()), max_block_size_have_to_block, max_response_bytes)
+    try:
+        while True:
+            try:
+                frame = conn.recv_bytes()
+            except EOFError:
+                break
+            if frame[0] == STOP:
+                break
+            for out_frame in loop.run_until_complete(worker.handle(frame)):
+                conn.send_bytes(out_frame)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        loop.close()
+        conn.close()
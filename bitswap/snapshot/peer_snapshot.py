@@ -0,0 +1,99 @@
+from typing import Optional, Any, Dict, NoReturn, TYPE_CHECKING
+from dataclasses import astuple
+from logging import INFO
+from functools import partial
+from time import time
+import asyncio
+import json
+import os
+
+from ..peer.peer_stats import PeerStats
+from ..task.task import Task
+from ..logger import get_stream_logger_colored, get_concurrent_logger
+
+if TYPE_CHECKING:
+    from ..peer.base_peer_manager import BasePeerManager
+    from ..provider.base_provider_cache import BaseProviderCache
+
+
+class PeerSnapshot:
+
+    version = 1
+
+    def __init__(self, path: str, peer_manager: 'BasePeerManager',
+                 provider_cache: Optional['BaseProviderCache'] = None, period: float = 300,
+                 half_life: float = 3600, log_level: int = INFO, log_path: Optional[str] = None) -> None:
+        if log_path is None:
+            self._logger = get_stream_logger_colored(__name__, log_level)
+        else:
+            self._logger = get_concurrent_logger(__name__, log_path, log_level)
+        self._path = path
+        self._peer_manager = peer_manager
+        self._provider_cache = provider_cache
+        self._period = period
+        self._half_life = half_life
+        self._snapshot_task: Optional[asyncio.Task] = None
+
+    def run(self) -> None:
+        if self._snapshot_task is None:
+            self._snapshot_task = Task.create_task(self._snapshot_loop(),
+                                                   partial(Task.base_callback, logger=self._logger))
+
+    def stop(self) -> None:
+        self._snapshot_task.cancel()
+        self._snapshot_task = None
+
+    async def load(self) -> bool:
+        try:
+            snapshot = await asyncio.get_running_loop().run_in_executor(None, self._read)
+        except FileNotFoundError:
+            self._logger.debug('No peer snapshot, path: %s', self._path)
+            return False
+        except Exception as e:
+            self._logger.warning('Cant read peer snapshot, path: %s, e: %s', self._path, e)
+            return False
+        if snapshot.get('v') != self.version:
+            self._logger.warning('Unknown peer snapshot version, version: %s', snapshot.get('v'))
+            return False
+        age = max(time() - snapshot['t'], 0)
+        decay = 0.5 ** (age / self._half_life)
+        peers_stats: Dict[str, PeerStats] = {}
+        for str_peer_cid, fields in snapshot['p'].items():
+            stats = PeerStats(*fields)
+            stats.decay(decay)
+            peers_stats[str_peer_cid] = stats
+        self._peer_manager.set_peers_stats(peers_stats)
+        if self._provider_cache is not None:
+            self._provider_cache.load(snapshot['r'], age, decay)
+        self._logger.debug('Load peer snapshot, peers: %d, age: %s', len(peers_stats), age)
+        return True
+
+    async def save(self) -> None:
+        snapshot = {
+            'v': self.version,
+            't': time(),
+            'p': {s: astuple(stats) for s, stats in self._peer_manager.get_peers_stats().items()},
+            'r': self._provider_cache.dump() if self._provider_cache is not None else {},
+        }
+        await asyncio.get_running_loop().run_in_executor(None, self._write, snapshot)
+        self._logger.debug('Save peer snapshot, peers: %d', len(snapshot['p']))
+
+    async def _snapshot_loop(self) -> NoReturn:
+        while True:
+            await asyncio.sleep(self._period)
+            try:
+                await self.save()
+            except asyncio.exceptions.CancelledError:
+                raise
+            except Exception as e:
+                self._logger.exception('Save peer snapshot exception, e: %s', e)
+
+    def _read(self) -> Dict[str, Any]:
+        with open(self._path, 'r') as f:
+            return json.load(f)
+
+    def _write(self, snapshot: Dict[str, Any]) -> None:
+        tmp_path = f'{self._path}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(snapshot, f, separators=(',', ':'))
+        os.replace(tmp_path, self._path)
@@ -0,0 +1,16 @@
+from abc import ABCMeta, abstractmethod
+from typing import Optional, List, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from ..peer.peer import Peer
+
+
+class BaseStrategy(metaclass=ABCMeta):
+
+    @abstractmethod
+    def select_peer(self, peers: List['Peer']) -> Optional['Peer']:
+        pass
+
+    @abstractmethod
+    def served(self, peer: 'Peer', size: int) -> None:
+        pass
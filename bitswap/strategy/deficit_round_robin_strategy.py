@@ -0,0 +1,41 @@
+from typing import Optional, List, Dict, TYPE_CHECKING
+from collections import OrderedDict
+from math import exp
+
+from .base_strategy import BaseStrategy
+
+if TYPE_CHECKING:
+    from ..peer.peer import Peer
+
+
+class DeficitRoundRobinStrategy(BaseStrategy):
+
+    def __init__(self, quantum: int = 256 * 1024, min_weight: float = 0.05) -> None:
+        self._quantum = quantum
+        self._min_weight = min_weight
+        self._deficits: 'OrderedDict[str, float]' = OrderedDict()
+
+    def select_peer(self, peers: List['Peer']) -> Optional['Peer']:
+        active: Dict[str, 'Peer'] = {str(p.cid): p for p in peers}
+        if not active:
+            self._deficits.clear()
+            return
+        for str_peer_cid in [s for s in self._deficits if s not in active]:
+            del self._deficits[str_peer_cid]
+        for str_peer_cid in active:
+            if str_peer_cid not in self._deficits:
+                self._deficits[str_peer_cid] = 0
+        while True:
+            str_peer_cid = next(iter(self._deficits))
+            if self._deficits[str_peer_cid] > 0:
+                return active[str_peer_cid]
+            self._deficits[str_peer_cid] += self._quantum * self.weight(active[str_peer_cid])
+            self._deficits.move_to_end(str_peer_cid)
+
+    def served(self, peer: 'Peer', size: int) -> None:
+        str_peer_cid = str(peer.cid)
+        if str_peer_cid in self._deficits:
+            self._deficits[str_peer_cid] -= size
+
+    def weight(self, peer: 'Peer') -> float:
+        return max(1 - 1 / (1 + exp(6 - 3 * peer.debt_ratio)), self._min_weight)
@@ -0,0 +1,19 @@
+from typing import Optional, List, TYPE_CHECKING
+
+from .base_strategy import BaseStrategy
+from ..queue_manager.queue_manager import QueueManager
+
+if TYPE_CHECKING:
+    from ..peer.peer import Peer
+
+
+class PeerRankStrategy(BaseStrategy):
+
+    def select_peer(self, peers: List['Peer']) -> Optional['Peer']:
+        peers_sm_q = QueueManager.get_peers_smallest_response_queue(peers)
+        if peers_sm_q is None:
+            return
+        return max(peers_sm_q, key=lambda p: p.peer_rank)
+
+    def served(self, peer: 'Peer', size: int) -> None:
+        pass
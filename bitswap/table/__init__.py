@@ -1 +1,2 @@
 from .hash_funcs import HASH_TABLE
+from .cid_table import CID_CACHE, PREFIX_TABLE
@@ -0,0 +1,96 @@
+from typing import Union, Dict, Tuple, Callable
+from collections import OrderedDict
+from io import BytesIO
+
+from cid import CIDv0, CIDv1, make_cid
+from multicodec import get_prefix
+from multicodec.constants import CODE_TABLE
+from varint import encode, decode_stream
+import multihash
+
+from .hash_funcs import HASH_TABLE
+
+
+class CidCache:
+
+    def __init__(self, max_size: int = 65536) -> None:
+        self._max_size = max_size
+        self._cids: 'OrderedDict[Union[bytes, Tuple[int, str, bytes]], Union[CIDv0, CIDv1]]' = OrderedDict()
+        self._encoded: 'OrderedDict[Tuple[int, str, bytes], bytes]' = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._cids)
+
+    def decode(self, raw: bytes) -> Union[CIDv0, CIDv1]:
+        cid = self._cids.get(raw)
+        if cid is None:
+            cid = make_cid(raw)
+            self._put(self._cids, raw, cid)
+        else:
+            self._cids.move_to_end(raw)
+        return cid
+
+    def from_parts(self, version: int, codec: str, multi_hash: bytes) -> Union[CIDv0, CIDv1]:
+        key = (version, codec, multi_hash)
+        cid = self._cids.get(key)
+        if cid is None:
+            cid = make_cid(version, codec, multi_hash)
+            self._put(self._cids, key, cid)
+        else:
+            self._cids.move_to_end(key)
+        return cid
+
+    def encode(self, cid: Union[CIDv0, CIDv1]) -> bytes:
+        key = (cid.version, cid.codec, cid.multihash)
+        raw = self._encoded.get(key)
+        if raw is None:
+            raw = cid.encode()
+            self._put(self._encoded, key, raw)
+        else:
+            self._encoded.move_to_end(key)
+        return raw
+
+    def clear(self) -> None:
+        self._cids.clear()
+        self._encoded.clear()
+
+    def _put(self, cache: OrderedDict, key: Union[bytes, Tuple[int, str, bytes]], value: Union[bytes, CIDv0, CIDv1]
+             ) -> None:
+        cache[key] = value
+        if len(cache) > self._max_size:
+            cache.popitem(last=False)
+
+
+class CidPrefixTable:
+
+    def __init__(self, max_size: int = 1024) -> None:
+        self._max_size = max_size
+        self._decoded: Dict[bytes, Tuple[int, str, int, Callable]] = {}
+        self._encoded: Dict[Tuple[int, str, bytes], bytes] = {}
+
+    def decode(self, prefix: bytes) -> Tuple[int, str, int, Callable]:
+        decoded = self._decoded.get(prefix)
+        if decoded is None:
+            bytes_stream = BytesIO(prefix)
+            cid_version = decode_stream(bytes_stream)
+            multi_codec = decode_stream(bytes_stream)
+            hash_code = multihash.coerce_code(decode_stream(bytes_stream))
+            decoded = (cid_version, CODE_TABLE[multi_codec], hash_code, HASH_TABLE[hash_code])
+            if len(self._decoded) >= self._max_size:
+                self._decoded.clear()
+            self._decoded[prefix] = decoded
+        return decoded
+
+    def encode(self, cid: Union[CIDv0, CIDv1]) -> bytes:
+        key = (cid.version, cid.codec, cid.multihash[:2])
+        prefix = self._encoded.get(key)
+        if prefix is None:
+            prefix = encode(cid.version) + get_prefix(cid.codec) + multihash.get_prefix(cid.multihash)
+            if len(self._encoded) >= self._max_size:
+                self._encoded.clear()
+            self._encoded[key] = prefix
+        return prefix
+
+
+CID_CACHE = CidCache()
+PREFIX_TABLE = CidPrefixTable()
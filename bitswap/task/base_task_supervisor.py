@@ -0,0 +1,30 @@
+from abc import ABCMeta, abstractmethod
+from typing import Coroutine, Dict, Optional
+import asyncio
+
+
+class BaseTaskSupervisor(metaclass=ABCMeta):
+
+    @abstractmethod
+    def spawn(self, group_name: str, coro: Coroutine) -> Optional[asyncio.Future]:
+        pass
+
+    @abstractmethod
+    async def wait_capacity(self, group_name: str) -> None:
+        pass
+
+    @abstractmethod
+    def set_limits(self, group_name: str, max_concurrent: Optional[int], max_queued: Optional[int] = None) -> None:
+        pass
+
+    @abstractmethod
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        pass
+
+    @abstractmethod
+    async def shutdown(self, timeout: Optional[float] = None) -> None:
+        pass
+
+    @abstractmethod
+    def reopen(self) -> None:
+        pass
@@ -0,0 +1,143 @@
+from typing import Any, Coroutine, Deque, Dict, Optional, Set
+from collections import OrderedDict, deque
+from functools import partial
+from inspect import getcoroutinestate, CORO_CREATED
+from logging import Logger
+import asyncio
+
+
+class TaskGroup:
+
+    def __init__(self, name: str, logger: Logger, max_concurrent: Optional[int] = None,
+                 max_queued: Optional[int] = None, droppable: bool = False) -> None:
+        self.name = name
+        self._logger = logger
+        self.max_concurrent = max_concurrent
+        self.max_queued = max_queued
+        self.droppable = droppable
+        self._tasks: Set[asyncio.Task] = set()
+        self._pending: 'OrderedDict[asyncio.Future, Coroutine]' = OrderedDict()
+        self._capacity_waiters: Deque[asyncio.Future] = deque()
+        self._closed = False
+        self.spawned = 0
+        self.failed = 0
+        self.dropped = 0
+
+    def __len__(self) -> int:
+        return len(self._tasks) + len(self._pending)
+
+    @property
+    def running(self) -> int:
+        return len(self._tasks)
+
+    @property
+    def queued(self) -> int:
+        return len(self._pending)
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    @property
+    def full(self) -> bool:
+        return self.max_queued is not None and len(self) >= (self.max_concurrent or 0) + self.max_queued
+
+    def spawn(self, coro: Coroutine) -> Optional[asyncio.Future]:
+        if self._closed or (self.droppable and self.full):
+            coro.close()
+            self.dropped += 1
+            if not self._closed and self.dropped % 1000 == 1:
+                self._logger.warning('Task group queue full, tasks dropped, group: %s, queued: %d, dropped: %d',
+                                     self.name, self.queued, self.dropped)
+            return
+        self.spawned += 1
+        if self._has_slot():
+            return self._start(coro)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[future] = coro
+        future.add_done_callback(self._pending_done)
+        return future
+
+    async def wait_capacity(self) -> None:
+        while self.full and not self._closed:
+            waiter = asyncio.get_running_loop().create_future()
+            self._capacity_waiters.append(waiter)
+            await waiter
+
+    def set_limits(self, max_concurrent: Optional[int], max_queued: Optional[int] = None) -> None:
+        self.max_concurrent = max_concurrent
+        self.max_queued = max_queued
+        self._start_pending()
+        self._wake_capacity()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'running': self.running,
+            'queued': self.queued,
+            'spawned': self.spawned,
+            'failed': self.failed,
+            'dropped': self.dropped,
+        }
+
+    async def shutdown(self, timeout: Optional[float] = None) -> None:
+        self._closed = True
+        for future in list(self._pending):
+            future.cancel()
+        self._wake_capacity()
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.wait(tasks, timeout=timeout)
+
+    def reopen(self) -> None:
+        self._closed = False
+
+    def _has_slot(self) -> bool:
+        return self.max_concurrent is None or len(self._tasks) < self.max_concurrent
+
+    def _start(self, coro: Coroutine, future: Optional[asyncio.Future] = None) -> asyncio.Task:
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(partial(self._done, coro=coro, future=future))
+        if future is not None:
+            future.add_done_callback(partial(TaskGroup._cancel_task, task))
+        return task
+
+    def _start_pending(self) -> None:
+        while self._pending and self._has_slot() and not self._closed:
+            future, coro = self._pending.popitem(last=False)
+            future.remove_done_callback(self._pending_done)
+            self._start(coro, future)
+
+    def _pending_done(self, future: asyncio.Future) -> None:
+        coro = self._pending.pop(future, None)
+        if coro is not None:
+            coro.close()
+            self._wake_capacity()
+
+    def _wake_capacity(self) -> None:
+        while self._capacity_waiters and (self._closed or not self.full):
+            waiter = self._capacity_waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+
+    def _done(self, task: asyncio.Task, coro: Coroutine, future: Optional[asyncio.Future]) -> None:
+        self._tasks.discard(task)
+        if getcoroutinestate(coro) == CORO_CREATED:
+            coro.close()
+        if future is not None and not future.done():
+            future.set_result(None)
+        self._start_pending()
+        self._wake_capacity()
+        if task.cancelled():
+            return
+        e = task.exception()
+        if e is not None:
+            self.failed += 1
+            self._logger.warning('Task failed, group: %s, e: %r', self.name, e, exc_info=e)
+
+    @staticmethod
+    def _cancel_task(task: asyncio.Task, future: asyncio.Future) -> None:
+        if future.cancelled():
+            task.cancel()
@@ -0,0 +1,69 @@
+from typing import Coroutine, Dict, FrozenSet, Optional, Tuple
+from logging import INFO
+import asyncio
+
+from .base_task_supervisor import BaseTaskSupervisor
+from .task_group import TaskGroup
+from ..logger import get_stream_logger_colored, get_concurrent_logger
+
+
+class TaskSupervisor(BaseTaskSupervisor):
+
+    ENTRIES = 'entries'
+    CANCEL = 'cancel'
+    SESSION = 'session'
+    RESUME = 'resume'
+
+    default_limits: Dict[str, Tuple[Optional[int], Optional[int]]] = {
+        ENTRIES: (256, 16384),
+        CANCEL: (128, 16384),
+        SESSION: (None, 4096),
+        RESUME: (32, 1024),
+    }
+
+    droppable: FrozenSet[str] = frozenset()
+
+    def __init__(self, limits: Optional[Dict[str, Tuple[Optional[int], Optional[int]]]] = None,
+                 log_level: int = INFO, log_path: Optional[str] = None) -> None:
+        if log_path is None:
+            self._logger = get_stream_logger_colored(__name__, log_level)
+        else:
+            self._logger = get_concurrent_logger(__name__, log_path, log_level)
+        self._limits = dict(self.default_limits)
+        if limits is not None:
+            self._limits.update(limits)
+        self._groups: Dict[str, TaskGroup] = {}
+
+    def __len__(self) -> int:
+        return sum(len(group) for group in self._groups.values())
+
+    def group(self, group_name: str) -> TaskGroup:
+        group = self._groups.get(group_name)
+        if group is None:
+            max_concurrent, max_queued = self._limits.get(group_name, (None, None))
+            group = self._groups[group_name] = TaskGroup(group_name, self._logger, max_concurrent, max_queued,
+                                                         group_name in self.droppable)
+        return group
+
+    def spawn(self, group_name: str, coro: Coroutine) -> Optional[asyncio.Future]:
+        return self.group(group_name).spawn(coro)
+
+    async def wait_capacity(self, group_name: str) -> None:
+        await self.group(group_name).wait_capacity()
+
+    def set_limits(self, group_name: str, max_concurrent: Optional[int], max_queued: Optional[int] = None) -> None:
+        self._limits[group_name] = (max_concurrent, max_queued)
+        if group_name in self._groups:
+            self._groups[group_name].set_limits(max_concurrent, max_queued)
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        return {group_name: group.stats() for group_name, group in self._groups.items()}
+
+    async def shutdown(self, timeout: Optional[float] = None) -> None:
+        groups = list(self._groups.values())
+        self._logger.debug('Shutdown task groups, tasks: %d', len(self))
+        await asyncio.gather(*(group.shutdown(timeout) for group in groups))
+
+    def reopen(self) -> None:
+        for group in self._groups.values():
+            group.reopen()
@@ -0,0 +1,22 @@
+from abc import ABCMeta, abstractmethod
+from typing import Union, List, TYPE_CHECKING
+
+from cid import CIDv0, CIDv1
+
+if TYPE_CHECKING:
+    from ..peer.peer import Peer
+
+
+class BaseWantIndex(metaclass=ABCMeta):
+
+    @abstractmethod
+    def add(self, cid: Union[CIDv0, CIDv1], peer: 'Peer') -> None:
+        pass
+
+    @abstractmethod
+    def remove(self, cid: Union[CIDv0, CIDv1], peer: 'Peer') -> None:
+        pass
+
+    @abstractmethod
+    def get_peers(self, cid: Union[CIDv0, CIDv1]) -> List['Peer']:
+        pass
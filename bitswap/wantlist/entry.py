@@ -16,6 +16,7 @@ class Entry:
         self.priority = priority
         self.want_type = want_type
         self._block: Optional[bytes] = None
+        self.persisted = False
         self.block_event = Event()
         self.sessions = weakref.WeakSet()
 
@@ -32,7 +33,17 @@ class Entry:
     @block.deleter
     def block(self) -> None:
         self._block = None
+        self.persisted = False
         self.block_event.clear()
 
+    @property
+    def has_block(self) -> bool:
+        return self.block_event.is_set()
+
+    def release_block(self) -> None:
+        if self.block_event.is_set():
+            self._block = None
+            self.persisted = True
+
     def add_session(self, session: 'Session') -> None:
         self.sessions.add(session)
@@ -0,0 +1,16 @@
+from typing import Union, TYPE_CHECKING
+
+from cid import CIDv0, CIDv1
+
+if TYPE_CHECKING:
+    from ..message.proto_buff import ProtoBuff
+
+
+class RemoteEntry:
+
+    __slots__ = ('cid', 'priority', 'want_type')
+
+    def __init__(self, cid: Union[CIDv0, CIDv1], priority: int, want_type: 'ProtoBuff.WantType') -> None:
+        self.cid = cid
+        self.priority = priority
+        self.want_type = want_type
@@ -0,0 +1,43 @@
+from typing import Union, Dict, List, Tuple, TYPE_CHECKING
+
+from cid import CIDv0, CIDv1
+
+from .base_want_index import BaseWantIndex
+
+if TYPE_CHECKING:
+    from ..peer.peer import Peer
+
+BlockKey = Tuple[int, str, bytes]
+
+
+class WantIndex(BaseWantIndex):
+
+    def __init__(self) -> None:
+        self._peers: Dict[BlockKey, Dict[int, 'Peer']] = {}
+
+    def __len__(self) -> int:
+        return len(self._peers)
+
+    def add(self, cid: Union[CIDv0, CIDv1], peer: 'Peer') -> None:
+        key = WantIndex._key(cid)
+        peers = self._peers.get(key)
+        if peers is None:
+            peers = self._peers[key] = {}
+        peers[id(peer)] = peer
+
+    def remove(self, cid: Union[CIDv0, CIDv1], peer: 'Peer') -> None:
+        key = WantIndex._key(cid)
+        peers = self._peers.get(key)
+        if peers is None:
+            return
+        peers.pop(id(peer), None)
+        if not peers:
+            del self._peers[key]
+
+    def get_peers(self, cid: Union[CIDv0, CIDv1]) -> List['Peer']:
+        peers = self._peers.get(WantIndex._key(cid))
+        return list(peers.values()) if peers is not None else []
+
+    @staticmethod
+    def _key(cid: Union[CIDv0, CIDv1]) -> BlockKey:
+        return cid.version, cid.codec, cid.multihash
@@ -1,24 +1,33 @@
-from typing import Dict, Union, List, Iterator
+from typing import Dict, Union, List, Iterator, Callable
 from operator import attrgetter
 
 from cid import CIDv0, CIDv1
 
 from .entry import Entry
+from .remote_entry import RemoteEntry
 from ..message.proto_buff import ProtoBuff
 
 
+AnyEntry = Union[Entry, RemoteEntry]
+
+
 class WantList:
 
-    def __init__(self) -> None:
-        self._entries: Dict[str, Entry] = {}
+    def __init__(self, entry_factory: Callable[[Union[CIDv0, CIDv1], int, 'ProtoBuff.WantType'], AnyEntry] = Entry
+                 ) -> None:
+        self._entry_factory = entry_factory
+        self._entries: Dict[str, AnyEntry] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
 
     def __contains__(self, cid: Union[CIDv0, CIDv1]) -> bool:
         return str(cid) in self._entries
 
-    def __getitem__(self, cid: Union[CIDv0, CIDv1]) -> Entry:
+    def __getitem__(self, cid: Union[CIDv0, CIDv1]) -> AnyEntry:
         return self._entries[str(cid)]
 
-    def __iter__(self) -> Iterator[Entry]:
+    def __iter__(self) -> Iterator[AnyEntry]:
         return self._entries.values().__iter__()
 
     def add(self, cid: Union[CIDv0, CIDv1], priority: int,
@@ -28,7 +37,7 @@ class WantList:
         if entry is not None and (entry.want_type == ProtoBuff.WantType.Block or
                                   want_type == ProtoBuff.WantType.Have):
             return False
-        self._entries[str_cid] = Entry(cid, priority, want_type)
+        self._entries[str_cid] = self._entry_factory(cid, priority, want_type)
         return True
 
     def remove(self, cid: Union[CIDv0, CIDv1]) -> bool:
@@ -47,7 +56,7 @@ class WantList:
         del self._entries[str(cid)]
         return True
 
-    def entries(self) -> List[Entry]:
+    def entries(self) -> List[AnyEntry]:
         return list(self._entries.values())
 
     def absorb(self, other_want_list: 'WantList') -> None:
@@ -55,5 +64,5 @@ class WantList:
             self.add(entry.cid, entry.priority, entry.want_type)
 
     @staticmethod
-    def entries_sort_by_priority(entries: List[Entry]) -> None:
+    def entries_sort_by_priority(entries: List[AnyEntry]) -> None:
         entries.sort(key=attrgetter('priority'))
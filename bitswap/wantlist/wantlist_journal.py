@@ -0,0 +1,127 @@
+from typing import Union, Dict, List, Tuple, Optional, TextIO
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import json
+import os
+
+from cid import CIDv0, CIDv1
+
+
+class WantListJournal:
+
+    def __init__(self, path: str, compact_threshold: int = 10000) -> None:
+        self._path = path
+        self._compact_threshold = compact_threshold
+        self._wants: Dict[str, Tuple[int, int, Optional[str]]] = {}
+        self._records = 0
+        self._file: Optional[TextIO] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._early: List[list] = []
+        self._loaded = False
+        self._closed = True
+
+    def __len__(self) -> int:
+        return len(self._wants)
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def open(self) -> None:
+        self._closed = False
+
+    async def load(self) -> Dict[str, Tuple[int, int, Optional[str]]]:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='wantlist-journal')
+        self._closed = False
+        loop = asyncio.get_running_loop()
+        wants, self._records = await loop.run_in_executor(self._executor, self._read)
+        if self._closed:
+            return {}
+        touched = set()
+        for record in self._early:
+            touched.add(record[1])
+            if record[0] == 'w':
+                wants[record[1]] = (record[2], record[3], record[4])
+            else:
+                wants.pop(record[1], None)
+        self._early = []
+        self._wants = wants
+        self._loaded = True
+        await loop.run_in_executor(self._executor, self._compact, dict(self._wants))
+        self._records = len(self._wants)
+        return {str_cid: want for str_cid, want in wants.items() if str_cid not in touched}
+
+    def want(self, cid: Union[CIDv0, CIDv1], priority: int, want_type: int,
+             root_cid: Optional[Union[CIDv0, CIDv1]] = None) -> None:
+        if self._closed:
+            return
+        str_cid = str(cid)
+        str_root_cid = str(root_cid) if root_cid is not None else None
+        if self._wants.get(str_cid) == (priority, want_type, str_root_cid):
+            return
+        self._wants[str_cid] = (priority, want_type, str_root_cid)
+        self._append(['w', str_cid, priority, want_type, str_root_cid])
+
+    def done(self, cid: Union[CIDv0, CIDv1]) -> None:
+        if self._closed:
+            return
+        str_cid = str(cid)
+        if self._wants.pop(str_cid, None) is not None or not self._loaded:
+            self._append(['c', str_cid])
+
+    async def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        self._early = []
+        self._loaded = False
+        if self._executor is not None:
+            executor, self._executor = self._executor, None
+            await asyncio.get_running_loop().run_in_executor(executor, self._close_file)
+            executor.shutdown(wait=False)
+
+    def _append(self, record: list) -> None:
+        if not self._loaded:
+            self._early.append(record)
+            return
+        self._executor.submit(self._write, json.dumps(record, separators=(',', ':')) + '\n')
+        self._records += 1
+        if self._records > max(self._compact_threshold, 2 * len(self._wants)):
+            self._executor.submit(self._compact, dict(self._wants))
+            self._records = len(self._wants)
+
+    def _read(self) -> Tuple[Dict[str, Tuple[int, int, Optional[str]]], int]:
+        wants: Dict[str, Tuple[int, int, Optional[str]]] = {}
+        records = 0
+        if os.path.exists(self._path):
+            with open(self._path, 'r') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        break
+                    records += 1
+                    if record[0] == 'w':
+                        wants[record[1]] = (record[2], record[3], record[4])
+                    elif record[0] == 'c':
+                        wants.pop(record[1], None)
+        return wants, records
+
+    def _write(self, line: str) -> None:
+        if self._file is None:
+            self._file = open(self._path, 'a', buffering=1)
+        self._file.write(line)
+
+    def _compact(self, wants: Dict[str, Tuple[int, int, Optional[str]]]) -> None:
+        self._close_file()
+        tmp_path = f'{self._path}.tmp'
+        with open(tmp_path, 'w') as f:
+            for str_cid, (priority, want_type, str_root_cid) in wants.items():
+                f.write(json.dumps(['w', str_cid, priority, want_type, str_root_cid], separators=(',', ':')) + '\n')
+        os.replace(tmp_path, self._path)
+
+    def _close_file(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None